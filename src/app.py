@@ -3,18 +3,35 @@
 # Zuständig für Upload, Archivierung, Suche und Download
 # ==========================================================
 
+import logging
 import os
+import shutil
+import threading
+import time
+import uuid
 from dotenv import load_dotenv
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 
-from flask import Flask, request, jsonify, send_file, render_template
-
-from ocr import run_ocr
-from translate import translate_text
-from explain import explain_text
-from extract_institution import extract_institution
-from fileops import move_to_archive, ARCHIVE_DIR
-from indexer import update_index, read_index
+from flask import Flask, Response, g, request, jsonify, send_file, render_template, stream_with_context
+
+from config import get_setting
+from logs import configure_logging
+from metrics import CONTENT_TYPE, histogram, render_prometheus
+from ocr import load_ocr_libs
+from extract_institution import get_nlp
+from translate import translate_text, get_translator
+from explain import explain_text_stream, get_model
+from fileops import ARCHIVE_DIR
+from thumbnails import get_thumbnail, backfill_thumbnails, THUMB_EXTENSIONS
+from indexer import search_index, content_hash_for, get_documents, remove_from_index
+from fulltext import search_fulltext, remove_document, pending_among
+from pipeline import process_document, document_text, resume_pending, schedule_completion, PRIORITY_DEMAND
+from language import normalize_lang
+from listing import invalidate as invalidate_listing, list_directory, PAGE_SIZE
+import jobs
+
+configure_logging()
+log = logging.getLogger(__name__)
 
 # Flask-App initialisieren
 app = Flask(__name__, static_folder="static", template_folder="templates")
@@ -23,12 +40,79 @@ app = Flask(__name__, static_folder="static", template_folder="templates")
 # 📂 Projektpfade
 # ==========================================================
 ARCHIVE_ROOT = ARCHIVE_DIR
-INDEX_FILE = os.path.join(ARCHIVE_ROOT, "index.csv")
 
 # Falls noch nicht vorhanden → Hauptordner erstellen
 os.makedirs(ARCHIVE_ROOT, exist_ok=True)
 
 
+# ==========================================================
+# 🔥 Optionales Vorladen schwerer Bibliotheken im Hintergrund
+# (sonst erst beim ersten Upload / Übersetzen / Erklären)
+# ==========================================================
+def _warm_up():
+    steps = [
+        ("OCR", load_ocr_libs),
+        ("spaCy", get_nlp),
+        ("DeepL", get_translator),
+        ("Gemini", get_model),
+    ]
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            step()
+            log.info("Vorgeladen", extra={"component": name, "seconds": round(time.perf_counter() - start, 2)})
+        except Exception as e:
+            log.warning("Vorladen fehlgeschlagen", extra={"component": name, "error": str(e)})
+
+
+def start_background_tasks():
+    """
+    Startet Vorladen, Vorschaubild-Nachtrag, nachgeholte OCR und liegengebliebene
+    Uploads – nur im Server-Prozess.
+    Nicht beim Import: unter Windows (spawn) importiert jeder OCR-Worker dieses Modul
+    erneut als __mp_main__, ebenso Tests und Benchmarks.
+    """
+    if os.getenv("AUTODOC_WARMUP", str(get_setting("startup", "warmup", False))).lower() in ("1", "true", "yes"):
+        threading.Thread(target=_warm_up, name="warmup", daemon=True).start()
+
+    # 🖼️ Fehlende Vorschaubilder für das bestehende Archiv im Hintergrund erzeugen
+    if get_setting("thumbnails", "backfill_on_start", True):
+        threading.Thread(target=backfill_thumbnails, name="thumbnails", daemon=True).start()
+
+    # ⏳ Nach Neustart: noch ausstehende vollständige OCR (nur Briefkopf abgelegt) wieder einplanen
+    threading.Thread(target=resume_pending, name="resume-ocr", daemon=True).start()
+
+    # 📤 Angenommene, aber nicht mehr verarbeitete Uploads wieder einreihen
+    resume_uploads()
+
+
+# ==========================================================
+# 📊 Antwortzeiten je Route + /metrics (Prometheus)
+# ==========================================================
+REQUEST_SECONDS = histogram("autodoc_http_request_duration_seconds",
+                            "Antwortzeit der Flask-Routen (Streaming: bis zum Antwortbeginn)",
+                            ("endpoint", "status"))
+
+
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def _observe_request(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - start,
+                                endpoint=request.endpoint or "unknown", status=response.status_code)
+    return response
+
+
+@app.route("/metrics")
+def metrics():
+    return Response(render_prometheus(), mimetype=None, content_type=CONTENT_TYPE)
+
+
 # ==========================================================
 # 🌐 Hauptseite (Frontend laden)
 # ==========================================================
@@ -40,39 +124,118 @@ def index():
 # ==========================================================
 # 📤 Upload von Dateien
 # ==========================================================
+UPLOAD_INBOX = os.path.join(os.path.expanduser("~"), "Desktop", "AutoDocOrganizer", "ScansInbox")
+UPLOAD_LANG_FILE = ".ocr_lang"   # vorgegebene OCR-Sprachen, damit sie einen Neustart überstehen
+
+
+def _process_upload(temp_path: str, ocr_lang: str = None) -> dict:
+    """Job: Pipeline ausführen und den temporären Upload-Ordner aufräumen."""
+    result = process_document(temp_path, ocr_lang)
+    shutil.rmtree(os.path.dirname(temp_path), ignore_errors=True)
+    return result
+
+
+def resume_uploads():
+    """
+    Beim Start: Uploads, die angenommen (202), aber vor dem Beenden nicht mehr
+    verarbeitet wurden, wieder einreihen. Der Upload-Ordner heißt wie der Job,
+    die Job-ID bleibt also über den Neustart hinweg abrufbar.
+    """
+    if not os.path.isdir(UPLOAD_INBOX):
+        return
+    resumed = 0
+    with os.scandir(UPLOAD_INBOX) as entries:
+        upload_dirs = [entry for entry in entries if entry.is_dir()]
+    for upload_dir in upload_dirs:
+        names = [n for n in os.listdir(upload_dir.path) if n != UPLOAD_LANG_FILE]
+        if not names:
+            shutil.rmtree(upload_dir.path, ignore_errors=True)  # Upload beim Speichern abgebrochen
+            continue
+        ocr_lang = None
+        lang_file = os.path.join(upload_dir.path, UPLOAD_LANG_FILE)
+        if os.path.exists(lang_file):
+            with open(lang_file, encoding="utf-8") as f:
+                ocr_lang = f.read().strip() or None
+        try:
+            jobs.submit(names[0], _process_upload, os.path.join(upload_dir.path, names[0]), ocr_lang,
+                        job_id=upload_dir.name)
+        except jobs.QueueFullError:
+            log.warning("Warteschlange voll – restliche Uploads beim nächsten Start",
+                        extra={"files": len(upload_dirs) - resumed})
+            break
+        resumed += 1
+    if resumed:
+        log.info("Unverarbeitete Uploads wieder eingereiht", extra={"files": resumed})
+
+
 @app.route("/upload", methods=["POST"])
 def upload_files():
     files = request.files.getlist("files")
     if not files:
         return jsonify({"error": "Keine Dateien hochgeladen"}), 400
 
-    saved_files = []
+    # 🌐 Optional: OCR-Sprachen vorgeben (z. B. "deu+ron"), sonst automatisch
+    try:
+        ocr_lang = normalize_lang(request.form.get("ocr_lang"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    queued = []
+    rejected = []
     for file in files:
-        # 📌 Erst im TEMP-Ordner (Desktop/AutoDocOrganizer/ScansInbox)
-        inbox_dir = os.path.join(os.path.expanduser("~"), "Desktop", "AutoDocOrganizer", "ScansInbox")
-        os.makedirs(inbox_dir, exist_ok=True)
-        temp_path = os.path.join(inbox_dir, file.filename)
+        filename = os.path.basename(file.filename or "")
+        if not filename:
+            continue
+
+        # 📌 Erst im TEMP-Ordner (Desktop/AutoDocOrganizer/ScansInbox/<Job-ID>)
+        job_id = uuid.uuid4().hex
+        upload_dir = os.path.join(UPLOAD_INBOX, job_id)
+        os.makedirs(upload_dir, exist_ok=True)
+        temp_path = os.path.join(upload_dir, filename)
         file.save(temp_path)
+        if ocr_lang:
+            with open(os.path.join(upload_dir, UPLOAD_LANG_FILE), "w", encoding="utf-8") as f:
+                f.write(ocr_lang)
 
-        # 📝 OCR → Text extrahieren
-        text = run_ocr(temp_path)
+        # 🧵 OCR → Institution → Archiv → Index läuft im Hintergrund
+        try:
+            jobs.submit(filename, _process_upload, temp_path, ocr_lang, job_id=job_id)
+        except jobs.QueueFullError as e:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+            rejected.append({"filename": filename, "error": str(e)})
+            continue
 
-        # 🏢 Institution erkennen (Fallback = _Unklar)
-        institution = extract_institution(text) or "_Unklar"
+        queued.append({"id": job_id, "filename": filename})
 
-        # 📦 Datei direkt ins Archiv verschieben
-        final_path = move_to_archive(temp_path, institution)
+    if not queued:
+        return jsonify({"error": "Keine Dateien angenommen", "rejected": rejected}), 503
 
-        # 📝 Index aktualisieren (Jahr wird intern automatisch gesetzt)
-        update_index(final_path, institution)
+    return jsonify({"status": "queued", "jobs": queued, "rejected": rejected}), 202
+
+
+# ==========================================================
+# 🧵 Job-Status (Upload-Verarbeitung)
+# ==========================================================
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = jobs.get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job nicht gefunden"}), 404
+    return jsonify(job)
 
-        saved_files.append(final_path)
 
-    return jsonify({"status": "ok", "files": saved_files})
+@app.route("/jobs")
+def jobs_status():
+    ids = [i for i in request.args.get("ids", "").split(",") if i]
+    if not ids:
+        return jsonify({"error": "Keine Job-IDs angegeben"}), 400
+    return jsonify({"jobs": jobs.get_jobs(ids)})
 
 
 # ==========================================================
 # 📂 Verzeichnisinhalt auflisten (nur innerhalb Archive)
+# Seitenweise und sortiert (?sort=name|mtime|size&order=asc|desc&offset=&limit=),
+# Dateien mit Größe, Änderungszeit und Index-Daten → keine Folgeaufrufe nötig
 # ==========================================================
 @app.route("/list")
 def list_files():
@@ -86,15 +249,35 @@ def list_files():
     if not os.path.exists(abs_path):
         return jsonify({"error": f"Pfad nicht gefunden: {abs_path}"}), 404
 
-    items = []
-    for entry in sorted(os.listdir(abs_path), key=str.lower):
-        full = os.path.join(abs_path, entry)
-        items.append({
-            "name": entry,
-            "is_dir": os.path.isdir(full)
-        })
+    if not os.path.isdir(abs_path):
+        return jsonify({"error": "Kein Ordner"}), 400
 
-    return jsonify(items)
+    sort = request.args.get("sort", "name")
+    descending = request.args.get("order", "asc") == "desc"
+    offset = request.args.get("offset", 0, type=int)
+    limit = request.args.get("limit", PAGE_SIZE, type=int)
+    try:
+        listing = list_directory(abs_path, sort, descending, offset, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # 📝 Index-Daten nur für die Dateien dieser Seite (eine Abfrage)
+    files = {os.path.join(abs_path, item["name"]): item for item in listing["items"] if not item["is_dir"]}
+    documents = get_documents(files)
+    partial = pending_among(documents)
+    for path, item in files.items():
+        doc = documents.get(path)
+        if doc:
+            item.update(institution=doc["institution"], year=doc["year"], partial=path in partial)
+
+    return jsonify({
+        "path": subpath,
+        "items": listing["items"],
+        "total": listing["total"],
+        "offset": max(offset, 0),
+        "sort": sort,
+        "order": "desc" if descending else "asc",
+    })
 
 
 # ==========================================================
@@ -102,21 +285,43 @@ def list_files():
 # ==========================================================
 @app.route("/search")
 def search():
-    query = request.args.get("query", "").lower()
+    query = request.args.get("query", "")
+    limit = min(max(request.args.get("limit", 50, type=int), 1), 200)
+    offset = max(request.args.get("offset", 0, type=int), 0)
+
+    # 1️⃣ Treffer in Dateiname / Institution / Jahr, 2️⃣ BM25-Treffer im OCR-Text
     results = []
+    seen = set()
+    for row in search_index(query, limit=offset + limit):
+        seen.add(row["Pfad"])
+        results.append({
+            "filename": row["Datei"],
+            "year": row["Jahr"],
+            "institution": row["Institution"],
+            "path": row["Pfad"]
+        })
+
+    for hit in search_fulltext(query, limit=offset + limit):
+        if hit["path"] in seen:
+            continue
+        seen.add(hit["path"])
+        results.append({
+            "filename": hit["filename"],
+            "year": hit["year"],
+            "institution": hit["institution"],
+            "path": hit["path"],
+            "snippet": hit["snippet"]
+        })
 
-    for row in read_index():
-        if (query in row["Datei"].lower()
-            or query in row["Institution"].lower()
-            or query in row["Jahr"].lower()):
-            results.append({
-                "filename": row["Datei"],
-                "year": row["Jahr"],
-                "institution": row["Institution"],
-                "path": row["Pfad"]
-            })
+    # ⏳ Treffer, von denen erst der Briefkopf erkannt ist, markieren und vorziehen
+    page = results[offset:offset + limit]
+    partial = pending_among([item["path"] for item in page])
+    for item in page:
+        if item["path"] in partial:
+            item["partial"] = True
+            schedule_completion(item["path"], PRIORITY_DEMAND)
 
-    return jsonify(results)
+    return jsonify(page)
 
 
 # ==========================================================
@@ -132,7 +337,7 @@ def delete_originals():
         try:
             os.remove(os.path.join(desktop, fname))
         except Exception as e:
-            print(f"⚠️ Konnte Datei nicht löschen: {fname} – {e}")
+            log.warning("Konnte Datei nicht löschen", extra={"file": fname, "error": str(e)})
 
     return jsonify({"status": "ok"})
 
@@ -142,15 +347,15 @@ def delete_originals():
 # ==========================================================
 @app.route("/translate")
 def translate_file():
-    file_path = request.args.get("file")
     lang = request.args.get("lang", "EN-US")
 
-    abs_path = os.path.join(ARCHIVE_ROOT, file_path)
-    if not os.path.exists(abs_path):
-        return "❌ Datei nicht gefunden", 404
+    # Nur Dateien innerhalb des Archivs (wie /download)
+    abs_path, error = _resolve_download(request.args.get("file"))
+    if error:
+        return error
 
-    # 📝 OCR → Text extrahieren
-    text = run_ocr(abs_path)
+    # 📝 Volltext (ausstehende vollständige OCR wird jetzt vorgezogen)
+    text = document_text(abs_path)
 
     # 🌍 Übersetzen
     translated = translate_text(text, lang)
@@ -162,54 +367,107 @@ def translate_file():
 # ==========================================================
 @app.route("/explain")
 def explain_file():
-    file_path = request.args.get("file")
     lang = request.args.get("lang", "DE")   # 🔑 Default = Deutsch
 
-    abs_path = os.path.join(ARCHIVE_ROOT, file_path)
-    if not os.path.exists(abs_path):
-        return "❌ Datei nicht gefunden", 404
+    # Nur Dateien innerhalb des Archivs (wie /download)
+    abs_path, error = _resolve_download(request.args.get("file"))
+    if error:
+        return error
 
-    # 📝 OCR → Text extrahieren
-    text = run_ocr(abs_path)
+    # 📝 Volltext (ausstehende vollständige OCR wird jetzt vorgezogen)
+    text = document_text(abs_path)
 
-    # 🤖 Erklärung generieren (Sprache auswählbar)
-    explanation = explain_text(text, lang)
-    return explanation
+    # 🤖 Erklärung generieren (Sprache auswählbar) – wird gestreamt, sobald Gemini liefert
+    return Response(
+        stream_with_context(explain_text_stream(text, lang)),
+        mimetype="text/plain; charset=utf-8",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # ==========================================================
 # 📥 Datei herunterladen
+# Mit starkem ETag (Inhalts-Hash), Last-Modified und Range-Anfragen:
+# erneutes Öffnen kostet nur ein 304, der PDF-Viewer kann Teilbereiche laden
 # ==========================================================
-@app.route("/download")
-def download_file():
-    file_path = request.args.get("file")
+def _send_archive_file(abs_path: str, as_attachment: bool):
+    st = os.stat(abs_path)
+    response = send_file(
+        abs_path,
+        as_attachment=as_attachment,
+        conditional=True,
+        etag=content_hash_for(abs_path),
+        last_modified=st.st_mtime,
+    )
+    # Browser darf speichern, muss aber vor jeder Nutzung nachfragen (→ 304)
+    response.headers["Cache-Control"] = "private, no-cache"
+    # Werkzeug setzt das nur bei 206 – ohne Angabe im 200 fragt PDF.js nie nach Teilbereichen
+    response.headers["Accept-Ranges"] = "bytes"
+    return response
+
+
+def _resolve_download(file_path):
+    """Prüft den angefragten Pfad; liefert (abs_path, None) oder (None, Fehlerantwort)."""
     if not file_path:
-        return jsonify({"error": "Kein Dateipfad angegeben"}), 400
+        return None, (jsonify({"error": "Kein Dateipfad angegeben"}), 400)
 
     abs_path = os.path.normpath(os.path.join(ARCHIVE_ROOT, file_path))
-    if not abs_path.startswith(ARCHIVE_ROOT) or not os.path.exists(abs_path):
-        return jsonify({"error": "Datei nicht gefunden"}), 404
+    if not abs_path.startswith(ARCHIVE_ROOT + os.sep):
+        return None, (jsonify({"error": "Ungültiger Pfad"}), 400)
+    if not os.path.exists(abs_path):
+        return None, (jsonify({"error": "Datei nicht gefunden"}), 404)
 
     if os.path.isdir(abs_path):
-        return jsonify({"error": "Ordner können nicht heruntergeladen werden"}), 400
+        return None, (jsonify({"error": "Ordner können nicht heruntergeladen werden"}), 400)
+
+    return abs_path, None
 
-    return send_file(abs_path, as_attachment=False)
+
+@app.route("/download")
+def download_file():
+    abs_path, error = _resolve_download(request.args.get("file"))
+    if error:
+        return error
+    return _send_archive_file(abs_path, as_attachment=False)
 
 
 @app.route("/force_download")
 def force_download():
-    file_path = request.args.get("file")
-    if not file_path:
-        return jsonify({"error": "Kein Dateipfad angegeben"}), 400
+    abs_path, error = _resolve_download(request.args.get("file"))
+    if error:
+        return error
+    return _send_archive_file(abs_path, as_attachment=True)
 
-    abs_path = os.path.normpath(os.path.join(ARCHIVE_ROOT, file_path))
-    if not abs_path.startswith(ARCHIVE_ROOT) or not os.path.exists(abs_path):
-        return jsonify({"error": "Datei nicht gefunden"}), 404
 
-    if os.path.isdir(abs_path):
-        return jsonify({"error": "Ordner können nicht heruntergeladen werden"}), 400
+# ==========================================================
+# 🖼️ Vorschaubild (Seite 1 oder ?page=n)
+# ==========================================================
+@app.route("/thumbnail")
+def thumbnail():
+    abs_path, error = _resolve_download(request.args.get("file"))
+    if error:
+        return error
+    if not abs_path.lower().endswith(THUMB_EXTENSIONS):
+        return jsonify({"error": "Keine Vorschau für diesen Dateityp"}), 415
+
+    page_no = max(request.args.get("page", 1, type=int), 1)
+    content_hash = content_hash_for(abs_path)
+    try:
+        data = get_thumbnail(abs_path, content_hash, page_no)
+    except Exception as e:
+        return jsonify({"error": f"Vorschau fehlgeschlagen: {e}"}), 500
+    if data is None:
+        return jsonify({"error": "Seite nicht gefunden"}), 404
 
-    return send_file(abs_path, as_attachment=True)
+    response = Response(data, mimetype="image/jpeg")
+    response.set_etag(f"{content_hash}-{page_no}")
+    # Mit Versionsparameter (?v=...) ändert sich die URL bei neuem Inhalt → unbegrenzt cachebar,
+    # aber nur im Browser (private): Vorschauen privater Briefe gehören in keinen Proxy/CDN
+    if request.args.get("v"):
+        response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    else:
+        response.headers["Cache-Control"] = "private, max-age=604800"
+    return response.make_conditional(request)
 
 
 # ==========================================================
@@ -232,6 +490,9 @@ def delete_file():
 
     try:
         os.remove(abs_path)
+        remove_document(abs_path)
+        remove_from_index(abs_path)  # sonst gälte neuer identischer Inhalt weiter als Duplikat
+        invalidate_listing(os.path.dirname(abs_path))
         return jsonify({"status": "ok"})
     except Exception as e:
         return jsonify({"error": f"Löschen fehlgeschlagen: {e}"}), 500
@@ -256,8 +517,13 @@ def delete_folder():
         return jsonify({"error": "Kein Ordner"}), 400
 
     try:
-        import shutil
+        removed = [os.path.join(dirpath, name) for dirpath, _, names in os.walk(abs_path) for name in names]
         shutil.rmtree(abs_path)
+        for path in removed:
+            remove_document(path)
+            remove_from_index(path)
+        invalidate_listing(abs_path)
+        invalidate_listing(os.path.dirname(abs_path))
         return jsonify({"status": "ok"})
     except Exception as e:
         return jsonify({"error": f"Löschen fehlgeschlagen: {e}"}), 500
@@ -267,4 +533,8 @@ def delete_folder():
 # 🚀 Start der App
 # ==========================================================
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    DEBUG = True
+    # Im Debug-Modus läuft dieser Block zusätzlich im Reloader-Elternprozess → dort nichts starten
+    if not DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_tasks()
+    app.run(host="0.0.0.0", port=5000, debug=DEBUG)
@@ -0,0 +1 @@
+# 📊 Benchmarks für AutoDocOrganizer (Aufruf aus src/: python -m benchmarks.<name>)
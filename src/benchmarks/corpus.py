@@ -0,0 +1,194 @@
+# ==========================================================
+# 🧪 Synthetischer Dokumentenkorpus für Benchmarks
+# Deutsche Briefe mit bekannter Institution, ein- und mehrseitig,
+# als "gescanntes" Bild-PDF und als digital erzeugtes PDF mit Textebene
+# Reproduzierbar über den Seed; läuft komplett offline (nur Pillow)
+# Aufruf (aus src/): python -m benchmarks.corpus <Zielordner> [--docs 20] [--seed 42]
+# ==========================================================
+
+import argparse
+import json
+import os
+import random
+from datetime import date, timedelta
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+# Absender: Whitelist-Institutionen + frei erfundene (für spaCy / gesehene Namen)
+INSTITUTIONS = [
+    "Finanzamt", "Jobcenter", "Deutsche Rentenversicherung", "AOK", "Barmer",
+    "Sparkasse", "Volksbank", "Commerzbank",
+    "Stadtwerke Lahntal GmbH", "Müller & Partner Steuerberatung", "Hausverwaltung Becker KG",
+]
+CITIES = ["Gießen", "Marburg", "Wetzlar", "Frankfurt am Main", "Kassel"]
+SUBJECTS = ["Rechnung", "Bescheid", "Mahnung", "Kontoauszug", "Mitteilung", "Beitragsbescheinigung"]
+SENTENCES = [
+    "Sehr geehrte Damen und Herren,",
+    "wir bitten Sie, den offenen Betrag innerhalb von vierzehn Tagen zu überweisen.",
+    "Bitte geben Sie bei Rückfragen stets Ihre Kundennummer an.",
+    "Die Zahlung ist bis zum Monatsende fällig.",
+    "Gegen diesen Bescheid kann innerhalb eines Monats Widerspruch eingelegt werden.",
+    "Für weitere Fragen stehen wir Ihnen gerne zur Verfügung.",
+    "Die Beiträge wurden gemäß den gesetzlichen Bestimmungen berechnet.",
+    "Anbei erhalten Sie die Übersicht über alle Buchungen des vergangenen Quartals.",
+    "Wir danken für Ihr Vertrauen und verbleiben mit freundlichen Grüßen.",
+]
+
+PAGE_W, PAGE_H = 1240, 1754   # A4 bei 150 dpi
+PDF_W, PDF_H = 595, 842       # A4 in Punkt
+LINE_HEIGHT = 34
+LINES_PER_PAGE = 42
+
+
+def _font(size: int):
+    for name in ("DejaVuSans.ttf", "arial.ttf", "Arial.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+# ============================================================
+# ✉️ Brieftext
+# ============================================================
+def make_letter(rng: random.Random, pages: int) -> dict:
+    """Erzeugt Inhalt eines Briefes; erste Zeilen = Briefkopf mit Institution."""
+    institution = rng.choice(INSTITUTIONS)
+    city = rng.choice(CITIES)
+    day = date(2025, 1, 1) + timedelta(days=rng.randrange(365))
+    subject = rng.choice(SUBJECTS)
+
+    header = [
+        f"{institution} {city}",
+        f"Postfach {rng.randint(1000, 9999)}, {rng.randint(30000, 69999)} {city}",
+        "",
+        "Frau Erika Mustermann",
+        "Musterstraße 1",
+        f"{rng.randint(30000, 69999)} {rng.choice(CITIES)}",
+        "",
+        f"{city}, {day.strftime('%d.%m.%Y')}",
+        f"{subject} Nr. {rng.randint(100000, 999999)}",
+        "",
+    ]
+    lines = list(header)
+    while len(lines) < pages * LINES_PER_PAGE - 3:
+        lines.append(rng.choice(SENTENCES))
+    lines += ["", "Mit freundlichen Grüßen", institution]
+
+    page_lines = [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)][:pages]
+    return {"institution": institution, "subject": subject, "pages": page_lines}
+
+
+# ============================================================
+# 🖨️ "Gescannte" PDFs (nur Bilder, keine Textebene)
+# ============================================================
+def render_scanned(letter: dict, path: str, rng: random.Random):
+    font = _font(26)
+    images = []
+    for lines in letter["pages"]:
+        img = Image.new("L", (PAGE_W, PAGE_H), 255)
+        draw = ImageDraw.Draw(img)
+        y = 120
+        for line in lines:
+            draw.text((110, y), line, fill=rng.randint(0, 60), font=font)
+            y += LINE_HEIGHT
+        # leichte Scan-Artefakte: Unschärfe + minimale Schräglage
+        img = img.filter(ImageFilter.GaussianBlur(0.6)).rotate(rng.uniform(-0.8, 0.8), fillcolor=255)
+        images.append(img)
+    images[0].save(path, "PDF", resolution=150, save_all=True, append_images=images[1:])
+
+
+# ============================================================
+# 💻 Digital erzeugte PDFs (Textebene, Helvetica)
+# ============================================================
+def _pdf_escape(line: str) -> bytes:
+    raw = line.encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def render_digital(letter: dict, path: str):
+    """Minimaler PDF-Writer: eine Textebene pro Seite, WinAnsi-Kodierung für Umlaute."""
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    pages_id = len(objects) + 1 + 2 * len(letter["pages"])  # Seitenbaum kommt nach allen Seiten
+
+    page_ids = []
+    for lines in letter["pages"]:
+        stream = b"BT /F1 11 Tf 14 TL 60 780 Td\n"
+        stream += b"".join(b"(" + _pdf_escape(line) + b") Tj T*\n" for line in lines)
+        stream += b"ET"
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, PDF_W, PDF_H, content_id, font_id)
+        ))
+
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)))
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref)
+
+    with open(path, "wb") as f:
+        f.write(bytes(out))
+
+
+# ============================================================
+# 📚 Korpus erzeugen
+# ============================================================
+def build_corpus(target_dir: str, docs: int = 20, seed: int = 42, max_pages: int = 4) -> list:
+    """
+    Erzeugt docs Briefe, jeweils als gescannte und als digitale Variante.
+    Returns:
+        list[dict]: Manifest-Einträge {"file", "institution", "pages", "variant"}
+    """
+    rng = random.Random(seed)
+    os.makedirs(target_dir, exist_ok=True)
+
+    manifest = []
+    for i in range(docs):
+        pages = 1 if i % 3 else rng.randint(2, max_pages)  # jedes dritte Dokument mehrseitig
+        letter = make_letter(rng, pages)
+        for variant in ("scanned", "digital"):
+            fname = f"brief_{i:04d}_{variant}.pdf"
+            path = os.path.join(target_dir, fname)
+            if variant == "scanned":
+                render_scanned(letter, path, rng)
+            else:
+                render_digital(letter, path)
+            manifest.append({"file": fname, "institution": letter["institution"],
+                             "pages": len(letter["pages"]), "variant": variant})
+
+    with open(os.path.join(target_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"seed": seed, "docs": manifest}, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetischen Benchmark-Korpus erzeugen")
+    parser.add_argument("target")
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-pages", type=int, default=4)
+    args = parser.parse_args()
+
+    entries = build_corpus(args.target, args.docs, args.seed, args.max_pages)
+    print(f"🧪 {len(entries)} PDFs in {args.target} erzeugt")
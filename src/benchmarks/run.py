@@ -0,0 +1,261 @@
+# ==========================================================
+# 📊 Benchmark-Suite für AutoDocOrganizer
+# Misst jede Pipeline-Stufe einzeln auf dem synthetischen Korpus:
+# run_ocr, extract_institution, move_to_archive, update_index, /search
+# Läuft offline in einem temporären HOME (echtes Archiv bleibt unberührt)
+# Aufruf (aus src/): python -m benchmarks.run [--docs 20] [--compare alt.json]
+# ==========================================================
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS_DIR = os.path.abspath(os.path.join(SRC_DIR, "..", "bench_results"))
+
+SEARCH_QUERIES = ["Finanzamt", "Sparkasse", "Rechnung", "Gießen", "Widerspruch", "Kundennummer",
+                  "2025", "Stadtwerke", "Beitr", "Buchungen Quartal"]
+
+
+def summarize(samples: list) -> dict:
+    """Kennzahlen einer Stufe in Millisekunden."""
+    if not samples:
+        return {"n": 0}
+    ordered = sorted(samples)
+    return {
+        "n": len(samples),
+        "total_s": round(sum(samples), 4),
+        "mean_ms": round(statistics.mean(samples) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def timed(samples: list, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    samples.append(time.perf_counter() - start)
+    return result
+
+
+def _isolate(work_dir: str):
+    """Alle Pfade (Archiv, Cache, index.db) zeigen ins temporäre Verzeichnis."""
+    os.environ["HOME"] = work_dir
+    os.environ["USERPROFILE"] = work_dir
+    os.environ.setdefault("TRANSLATE_BACKEND", "fake")
+    os.environ.setdefault("EXPLAIN_BACKEND", "fake")
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+
+    import config
+    config.load_settings().setdefault("thumbnails", {})["backfill_on_start"] = False
+
+    # Nur Warnungen/Fehler ausgeben, sonst überdecken Info-Logs die Messwerte
+    os.environ.setdefault("AUTODOC_LOG_LEVEL", "WARNING")
+    from logs import configure_logging
+    configure_logging()
+
+    import extract_institution
+    extract_institution.INSTITUTIONS_FILE = os.path.join(work_dir, "institutions_seen.json")
+
+
+def _scan_page_images(corpus_dir: str, docs: list, limit: int = 6) -> list:
+    """Seitenbilder direkt aus den Scan-PDFs (PyPDF2, ohne Poppler)."""
+    from PIL import Image
+    from PyPDF2 import PdfReader
+
+    images = []
+    for doc in docs:
+        if doc["variant"] != "scanned":
+            continue
+        for page in PdfReader(os.path.join(corpus_dir, doc["file"])).pages:
+            for image in page.images:
+                images.append(Image.open(io.BytesIO(image.data)))
+                if len(images) >= limit:
+                    return images
+    return images
+
+
+def bench_engines(corpus_dir: str, docs: list, stage, errors: dict):
+    """
+    Tesseract-Zeit pro Seite je Anbindung (pytesseract = ein Prozess pro Seite,
+    tesserocr = Engine bleibt geladen). Die leere Seite misst den reinen Overhead.
+    """
+    import ocr
+    from PIL import Image
+
+    pages = _scan_page_images(corpus_dir, docs)
+    blank = Image.new("L", (200, 100), 255)
+    configured = ocr.OCR_ENGINE
+    try:
+        for engine in ("pytesseract", "tesserocr"):
+            ocr.OCR_ENGINE = engine
+            if ocr.engine_name() != engine:
+                errors[f"engine[{engine}]"] = "nicht installiert"
+                continue
+            try:
+                for img in pages:
+                    timed(stage(f"tesseract_page[{engine}]"), ocr._ocr_image, img, 150)
+                for _ in range(5):
+                    timed(stage(f"tesseract_overhead[{engine}]"), ocr._ocr_image, blank, 150)
+            except Exception as e:
+                errors[f"engine[{engine}]"] = str(e)
+                print(f"❌ {engine}: {e}")
+    finally:
+        ocr.OCR_ENGINE = configured
+
+
+def run_benchmark(corpus_dir: str, work_dir: str) -> dict:
+    import ocr
+    from extract_institution import extract_institution
+    from fileops import move_to_archive, file_hash
+    from indexer import update_index
+    from fulltext import index_document
+
+    with open(os.path.join(corpus_dir, "manifest.json"), encoding="utf-8") as f:
+        docs = json.load(f)["docs"]
+
+    samples = {}
+    errors = {}
+    correct = {"scanned": 0, "digital": 0}
+    header_correct = {"scanned": 0, "digital": 0}
+    total = {"scanned": 0, "digital": 0}
+    inbox = os.path.join(work_dir, "inbox")
+    os.makedirs(inbox, exist_ok=True)
+
+    def stage(name):
+        return samples.setdefault(name, [])
+
+    for doc in docs:
+        path = os.path.join(corpus_dir, doc["file"])
+        variant = doc["variant"]
+        content_hash = file_hash(path)
+
+        def matches(institution):
+            return doc["institution"].lower() in institution.lower() or institution.lower() in doc["institution"].lower()
+
+        try:
+            # 🏷️ Nur Briefkopf (pipeline.header_first) – reicht er für die Institution?
+            header = timed(stage(f"ocr_header[{variant}]"), ocr.ocr_header, path, content_hash)
+            if matches(extract_institution(header["text"]) or "_Unklar"):
+                header_correct[variant] += 1
+
+            # 📝 OCR: erst ohne, dann mit Cache
+            result = timed(stage(f"run_ocr[{variant}]"), ocr.ocr_document, path, content_hash)
+            timed(stage("run_ocr[cached]"), ocr.run_ocr, path)
+            pages = len(result["pages"]) or 1
+            stage(f"run_ocr_per_page[{variant}]").append(samples[f"run_ocr[{variant}]"][-1] / pages)
+            text = result["text"]
+
+            # 🏢 Institution
+            institution = timed(stage("extract_institution"), extract_institution, text) or "_Unklar"
+            total[variant] += 1
+            if matches(institution):
+                correct[variant] += 1
+
+            # 📦 Archivieren (Kopie, damit der Korpus erhalten bleibt)
+            incoming = os.path.join(inbox, doc["file"])
+            shutil.copy2(path, incoming)
+            final_path = timed(stage("move_to_archive"), move_to_archive, incoming, institution)
+
+            # 📝 Index + Volltext
+            timed(stage("update_index"), update_index, final_path, institution, content_hash)
+            timed(stage("index_document"), index_document, final_path, text)
+        except Exception as e:
+            errors[doc["file"]] = str(e)
+            print(f"❌ {doc['file']}: {e}")
+
+    # 🔤 Tesseract-Anbindungen im Vergleich
+    bench_engines(corpus_dir, docs, stage, errors)
+
+    # 🔍 /search über die Flask-App
+    try:
+        import app
+        client = app.app.test_client()
+        for query in SEARCH_QUERIES:
+            for _ in range(5):
+                timed(stage("search"), client.get, "/search", query_string={"query": query})
+    except ImportError as e:
+        print(f"⚠️ /search übersprungen (Flask nicht verfügbar): {e}")
+
+    return {
+        "stages": {name: summarize(values) for name, values in samples.items()},
+        "institution_accuracy": {v: round(correct[v] / total[v], 3) if total[v] else None for v in total},
+        "header_accuracy": {v: round(header_correct[v] / total[v], 3) if total[v] else None for v in total},
+        "errors": errors,
+    }
+
+
+def compare(current: dict, previous_path: str):
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    print(f"\n📈 Vergleich mit {previous_path} (Mittelwert):")
+    for name, stats in sorted(current["stages"].items()):
+        old = previous.get("stages", {}).get(name, {})
+        if not stats.get("n") or not old.get("n"):
+            continue
+        change = (stats["mean_ms"] - old["mean_ms"]) / old["mean_ms"] * 100 if old["mean_ms"] else 0.0
+        print(f"   {name:28s} {old['mean_ms']:10.2f} ms → {stats['mean_ms']:10.2f} ms ({change:+.1f} %)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark der Pipeline-Stufen")
+    parser.add_argument("--corpus", help="Vorhandener Korpus (sonst wird einer erzeugt)")
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Ergebnisdatei (Standard: bench_results/bench-<Zeit>.json)")
+    parser.add_argument("--compare", help="Früheres Ergebnis zum Vergleich")
+    parser.add_argument("--keep", action="store_true", help="Arbeitsverzeichnis nicht löschen")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="autodoc-bench-")
+    _isolate(work_dir)
+
+    try:
+        corpus_dir = args.corpus
+        if not corpus_dir:
+            from benchmarks.corpus import build_corpus
+            corpus_dir = os.path.join(work_dir, "corpus")
+            build_corpus(corpus_dir, docs=args.docs, seed=args.seed)
+
+        start = time.perf_counter()
+        result = run_benchmark(corpus_dir, work_dir)
+        result.update({
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "wall_s": round(time.perf_counter() - start, 3),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "corpus": {"path": args.corpus, "docs": args.docs, "seed": args.seed},
+        })
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    for name, stats in sorted(result["stages"].items()):
+        if stats.get("n"):
+            print(f"⏱️ {name:28s} n={stats['n']:4d}  mean {stats['mean_ms']:10.2f} ms  p95 {stats['p95_ms']:10.2f} ms")
+    print(f"🏢 Trefferquote Institution: {result['institution_accuracy']}")
+    print(f"🏷️ Trefferquote nur Briefkopf: {result['header_accuracy']}")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"💾 Ergebnis gespeichert: {out}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
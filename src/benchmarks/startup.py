@@ -0,0 +1,99 @@
+# ==========================================================
+# 🚀 Startup-Benchmark für AutoDocOrganizer
+# Misst Zeit bis zur ersten Antwort (/list) und Speicherbedarf (RSS)
+# in einem frischen Python-Prozess; Exit-Code 1 bei Regression
+# Aufruf (aus src/): python -m benchmarks.startup [--runs 5] [--max-seconds 1.5]
+# ==========================================================
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# 🐘 Diese Module dürfen für /list nicht geladen werden
+HEAVY_MODULES = ["spacy", "deepl", "google.generativeai", "pytesseract", "pdf2image", "PyPDF2"]
+
+# Läuft im Kindprozess: App importieren, erste Anfrage stellen, Messwerte als JSON ausgeben
+_PROBE = r"""
+import json, sys, time
+start = time.perf_counter()
+import app
+response = app.app.test_client().get("/list")
+elapsed = time.perf_counter() - start
+
+rss_mb = None
+try:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss_kb / 1024 / (1024 if sys.platform == "darwin" else 1)
+except ImportError:
+    try:
+        import psutil
+        rss_mb = psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        pass
+
+print(json.dumps({
+    "seconds": elapsed,
+    "rss_mb": rss_mb,
+    "status": response.status_code,
+    "loaded": [m for m in HEAVY if m in sys.modules],
+}))
+"""
+
+
+def measure_once(home: str) -> dict:
+    env = dict(os.environ, HOME=home, USERPROFILE=home, AUTODOC_WARMUP="0")
+    code = f"HEAVY = {HEAVY_MODULES!r}\n" + _PROBE
+    out = subprocess.run([sys.executable, "-c", code], cwd=SRC_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup-Benchmark (time-to-first-request, RSS)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=1.5, help="Grenze für den Median")
+    parser.add_argument("--max-rss-mb", type=float, default=150.0)
+    parser.add_argument("--json", help="Ergebnis zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        runs = [measure_once(home) for _ in range(args.runs)]
+
+    seconds = statistics.median(r["seconds"] for r in runs)
+    rss = [r["rss_mb"] for r in runs if r["rss_mb"] is not None]
+    rss_mb = statistics.median(rss) if rss else None
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+
+    result = {"runs": args.runs, "median_seconds": seconds, "median_rss_mb": rss_mb,
+              "heavy_modules_loaded": loaded, "status": runs[-1]["status"]}
+    print(f"🚀 Erste Antwort nach {seconds * 1000:.0f} ms (Median aus {args.runs}), "
+          f"RSS {rss_mb:.0f} MB" if rss_mb is not None else f"🚀 Erste Antwort nach {seconds * 1000:.0f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    problems = []
+    if result["status"] != 200:
+        problems.append(f"/list antwortet mit {result['status']}")
+    if loaded:
+        problems.append(f"schwere Module beim Start geladen: {', '.join(loaded)}")
+    if seconds > args.max_seconds:
+        problems.append(f"Start {seconds:.2f} s > {args.max_seconds:.2f} s")
+    if rss_mb is not None and rss_mb > args.max_rss_mb:
+        problems.append(f"RSS {rss_mb:.0f} MB > {args.max_rss_mb:.0f} MB")
+
+    for problem in problems:
+        print(f"❌ Regression: {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# ==========================================================
+# 🗄️ Persistenter Datei-Cache für AutoDocOrganizer
+# Einträge liegen unter Desktop/AutoDocOrganizer/Cache/<Name>/
+# Logik: Schlüssel → SHA-256-Dateiname, Verdrängung nach Größe (LRU)
+# ==========================================================
+
+import hashlib
+import json
+import os
+import threading
+
+from fileops import CACHE_DIR
+from metrics import CACHE_REQUESTS
+
+
+class DiskCache:
+    """
+    Einfacher, prozessübergreifend lesbarer Key-Value-Cache auf der Festplatte.
+    Jeder Eintrag ist eine eigene Datei; geschrieben wird atomar (tmp + replace),
+    damit App, Watcher und Importer gleichzeitig darauf zugreifen können.
+    """
+
+    def __init__(self, name: str, max_bytes: int):
+        self.name = name
+        self.directory = os.path.join(CACHE_DIR, name)
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    # ------------------------------------------------------
+    # 📥 Lesen / Schreiben
+    # ------------------------------------------------------
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            CACHE_REQUESTS.inc(cache=self.name, result="miss")
+            return None
+        CACHE_REQUESTS.inc(cache=self.name, result="hit")
+
+        # 🕒 Zugriffszeit aktualisieren → zuletzt benutzt (für LRU)
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return data
+
+    def set(self, key: str, value: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(value)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def get_json(self, key: str):
+        data = self.get(key)
+        if data is None:
+            return None
+        try:
+            return json.loads(data.decode("utf-8"))
+        except ValueError:
+            return None
+
+    def set_json(self, key: str, value):
+        self.set(key, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    # ------------------------------------------------------
+    # 🧹 Größenbegrenzung
+    # ------------------------------------------------------
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for fname in files:
+                if fname.endswith(".tmp"):
+                    continue
+                full = os.path.join(root, fname)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                yield full, st.st_mtime, st.st_size
+
+    def _scan_size(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def _evict(self):
+        """Löscht die am längsten nicht benutzten Einträge bis auf 90 % des Limits."""
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        target = int(self.max_bytes * 0.9)
+
+        for full, _, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(full)
+                total -= size
+            except OSError:
+                pass
+
+        self._size = total
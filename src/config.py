@@ -0,0 +1,39 @@
+# ==========================================================
+# ⚙️ Einstellungen für AutoDocOrganizer
+# Liest config/settings.yml einmalig ein (Fallback = Standardwerte)
+# ==========================================================
+
+import logging
+import os
+
+SETTINGS_FILE = os.path.join(os.path.dirname(__file__), "..", "config", "settings.yml")
+
+_settings = None
+
+log = logging.getLogger(__name__)
+
+
+def load_settings() -> dict:
+    """
+    Lädt settings.yml genau einmal pro Prozess.
+    Fehlt die Datei oder PyYAML, wird mit leeren Einstellungen gearbeitet.
+    """
+    global _settings
+    if _settings is None:
+        try:
+            import yaml
+            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
+                _settings = yaml.safe_load(f) or {}
+        except (OSError, ImportError) as e:
+            log.warning("settings.yml konnte nicht geladen werden", extra={"error": str(e)})
+            _settings = {}
+    return _settings
+
+
+def get_setting(section: str, key: str, default=None):
+    """
+    Liefert einen Wert aus settings.yml, z. B. get_setting("ocr", "lang", "deu").
+    """
+    values = load_settings().get(section) or {}
+    value = values.get(key)
+    return default if value is None else value
@@ -1,30 +1,152 @@
 # 📁 explain.py
+import hashlib
+import logging
 import os
-import google.generativeai as genai
+import threading
+import time
+from types import SimpleNamespace
 
-def explain_text(text: str, target_lang: str = "DE") -> str:
+from cache_store import DiskCache
+from config import get_setting
+from metrics import STAGE_ERRORS, STAGE_SECONDS
+
+# 🔧 Einstellungen (config/settings.yml → explain, Backend per .env überschreibbar)
+EXPLAIN_BACKEND = os.getenv("EXPLAIN_BACKEND", get_setting("explain", "backend", "gemini"))
+GEMINI_MODEL = "models/gemini-flash-latest"
+
+# 🗄️ Erklärungen nach (Text-Hash, Sprache) cachen
+EXPLANATION_CACHE = DiskCache("explain", max_bytes=int(get_setting("explain", "cache_max_mb", 64)) * 1024 * 1024)
+
+_model = None
+_model_lock = threading.Lock()
+
+log = logging.getLogger(__name__)
+
+
+class FakeModel:
     """
-    Erklärt den gegebenen Text in einfacher Sprache
-    unter Nutzung von Google Gemini (neue API v1).
+    Lokaler Ersatz für Gemini (EXPLAIN_BACKEND=fake): liefert eine Pseudo-Erklärung
+    wortweise, mit einstellbarer Latenz bis zum ersten und zwischen den Wörtern.
     """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        return "❌ Fehler: GEMINI_API_KEY fehlt in .env"
 
+    def __init__(self, first_token_latency: float = 0.0, token_latency: float = 0.0):
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+
+    def _words(self, prompt: str):
+        text = prompt.split("\n\n", 1)[-1]
+        return ["Erklärung:"] + text.split()[:200]
+
+    def _stream(self, prompt: str):
+        time.sleep(self.first_token_latency)
+        for word in self._words(prompt):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            yield SimpleNamespace(text=word + " ")
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        if stream:
+            return self._stream(prompt)
+        return SimpleNamespace(text="".join(chunk.text for chunk in self._stream(prompt)))
+
+
+def get_model():
+    """
+    Ein Modell-Client pro Prozess (genai.configure nur einmal).
+    Returns:
+        GenerativeModel | FakeModel | None (wenn GEMINI_API_KEY fehlt)
+    """
+    global _model
+    if _model is not None:
+        return _model
+
+    with _model_lock:
+        if _model is None:
+            if EXPLAIN_BACKEND == "fake":
+                _model = FakeModel(float(os.getenv("EXPLAIN_FAKE_FIRST_TOKEN", "0")),
+                                   float(os.getenv("EXPLAIN_FAKE_LATENCY", "0")))
+            else:
+                api_key = os.getenv("GEMINI_API_KEY")
+                if not api_key:
+                    return None
+
+                import google.generativeai as genai  # erst bei Bedarf laden (schneller Start der App)
+
+                # ✅ Neue API Version (ganz wichtig!)
+                genai.configure(api_key=api_key)
+
+                # ✅ Funktioniert nur mit API v1 Keys
+                _model = genai.GenerativeModel(GEMINI_MODEL)
+    return _model
+
+
+def _chunk_text(chunk) -> str:
+    # Gemini-Teilantworten ohne Text (z. B. nur Sicherheitsinfos) werfen bei .text
     try:
-        # ✅ Neue API Version (ganz wichtig!)
-        genai.configure(api_key=api_key)
+        return chunk.text or ""
+    except ValueError:
+        return ""
 
-        # ✅ Funktioniert nur mit API v1 Keys
-        model = genai.GenerativeModel("models/gemini-flash-latest")
 
-        if not text.strip():
-            return "(Keine OCR-Erkennung / No text detected)"
+def explain_text_stream(text: str, target_lang: str = "DE"):
+    """
+    Erklärt den gegebenen Text in einfacher Sprache (Google Gemini, API v1)
+    und liefert die Antwort stückweise, sobald sie eintrifft.
+    Vollständige Antworten werden gecacht; Treffer kommen in einem Stück.
+    """
+    if not text.strip():
+        yield "(Keine OCR-Erkennung / No text detected)"
+        return
+
+    key = f"{hashlib.sha256(text.encode('utf-8')).hexdigest()}|{target_lang}|{EXPLAIN_BACKEND}"
+    cached = EXPLANATION_CACHE.get(key)
+    if cached is not None:
+        yield cached.decode("utf-8")
+        return
+
+    try:
+        model = get_model()
+        if model is None:
+            yield "❌ Fehler: GEMINI_API_KEY fehlt in .env"
+            return
 
         prompt = f"Erkläre den folgenden Text in klarer, einfacher Sprache auf {target_lang}:\n\n{text}"
 
-        response = model.generate_content(prompt)
-        return response.text.strip()
+        # ⏱️ Zeit bis zum ersten Textstück (= gefühlte Wartezeit) und Gesamtdauer
+        start = time.perf_counter()
+        parts = []
+        for chunk in model.generate_content(prompt, stream=True):
+            part = _chunk_text(chunk)
+            if part:
+                if not parts:
+                    STAGE_SECONDS.observe(time.perf_counter() - start, stage="explain_first_token")
+                parts.append(part)
+                yield part
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage="explain")
 
     except Exception as e:
-        return f"❌ KI-Fehler (Gemini): {e}"
+        STAGE_ERRORS.inc(stage="explain")
+        log.error("KI-Fehler (Gemini)", extra={"error": str(e)})
+        yield f"❌ KI-Fehler (Gemini): {e}"
+        return
+
+    answer = "".join(parts).strip()
+    if not answer:
+        # Blockiert oder ohne Textteile → nicht cachen, beim nächsten Aufruf erneut versuchen
+        STAGE_ERRORS.inc(stage="explain")
+        log.warning("Leere Antwort von Gemini, nicht gecacht", extra={"lang": target_lang})
+        yield "❌ Keine Erklärung erhalten (Antwort leer oder blockiert) – bitte erneut versuchen."
+        return
+
+    try:
+        EXPLANATION_CACHE.set(key, answer.encode("utf-8"))
+    except OSError as e:
+        log.warning("Erklärungs-Cache nicht schreibbar", extra={"error": str(e)})
+
+
+def explain_text(text: str, target_lang: str = "DE") -> str:
+    """
+    Erklärt den gegebenen Text in einfacher Sprache
+    unter Nutzung von Google Gemini (neue API v1).
+    """
+    return "".join(explain_text_stream(text, target_lang)).strip()
@@ -1,7 +1,15 @@
-import spacy
 import re
 import json
 import os
+import atexit
+import logging
+import threading
+import time
+
+from config import get_setting
+from fileops import file_lock
+from matcher import InstitutionMatcher
+from metrics import STAGE_SECONDS, counter, timed
 
 # 📂 Datei für dynamisch gesehene Institutionen
 INSTITUTIONS_FILE = os.path.join(os.path.dirname(__file__), "..", "institutions_seen.json")
@@ -16,6 +24,10 @@ KNOWN_INSTITUTIONS = [
     "Sparkasse", "Volksbank", "Commerzbank", "Deutsche Bank"
 ]
 
+# 💾 Neue Institutionen gesammelt schreiben (nach N Namen oder spätestens nach X Sekunden)
+FLUSH_EVERY = 20
+FLUSH_INTERVAL = 5.0
+
 # 🔑 Schlüsselwörter für typische ORGs
 ORG_HINTS = [
     "gmbh", "ag", "kg", "se",
@@ -25,53 +37,169 @@ ORG_HINTS = [
     "rewe", "aldi", "lidl"
 ]
 
-# 🧠 spaCy Modell laden
-try:
-    nlp = spacy.load("de_core_news_md")
-except OSError:
-    raise RuntimeError("❌ spaCy Modell nicht gefunden. Bitte installieren mit:\n"
-                       "   python -m spacy download de_core_news_md")
+# 🧠 spaCy-NER (wird erst bei Bedarf geladen, nur Komponenten für ORG-Erkennung)
+NER_MODEL = "de_core_news_md"
+NER_EXCLUDE = ["tagger", "morphologizer", "parser", "lemmatizer", "attribute_ruler", "senter"]
+NER_MAX_CHARS = int(get_setting("institution_extraction", "ner_max_chars", 1500))  # Briefkopf
+NER_BATCH_SIZE = int(get_setting("institution_extraction", "ner_batch_size", 32))
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+log = logging.getLogger(__name__)
+
+# 📊 Wie wurde die Institution gefunden? (known = Whitelist/gesehene Namen, ner = spaCy)
+CLASSIFIED = counter("autodoc_institutions_classified_total",
+                     "Klassifizierte Dokumente nach Erkennungsweg", ("method",))
+
+
+def get_nlp():
+    """
+    Lädt das spaCy-Modell beim ersten Aufruf (thread-sicher) und behält es im Speicher.
+    Parser, Tagger, Lemmatizer usw. werden gar nicht erst geladen.
+    """
+    global _nlp
+    if _nlp is not None:
+        return _nlp
+
+    with _nlp_lock:
+        if _nlp is None:
+            import spacy
+
+            start = time.perf_counter()
+            try:
+                nlp = spacy.load(NER_MODEL, exclude=NER_EXCLUDE)
+            except OSError:
+                raise RuntimeError("❌ spaCy Modell nicht gefunden. Bitte installieren mit:\n"
+                                   f"   python -m spacy download {NER_MODEL}")
+
+            # tok2vec nur behalten, wenn NER davon abhängt (bei *_md hat NER ein eigenes)
+            if "tok2vec" in nlp.pipe_names and "ner" not in nlp.get_pipe("tok2vec").listening_components:
+                nlp.remove_pipe("tok2vec")
+
+            _nlp = nlp
+            elapsed = time.perf_counter() - start
+            STAGE_SECONDS.observe(elapsed, stage="spacy_load")
+            log.info("spaCy geladen", extra={"seconds": round(elapsed, 2), "components": nlp.pipe_names})
+    return _nlp
+
+
+def _header(text: str) -> str:
+    """Nur der Kopfbereich geht in die NER – der Absender steht fast immer im Briefkopf."""
+    if len(text) <= NER_MAX_CHARS:
+        return text
+    cut = text.rfind("\n", 0, NER_MAX_CHARS)
+    return text[:cut if cut > 0 else NER_MAX_CHARS]
 
 
 # ============================================================
 # 📥 Gesehene Institutionen laden/speichern
+# Liste + Automat bleiben im Speicher, Schreiben erfolgt gebündelt
 # ============================================================
-def load_institutions():
+_registry_lock = threading.RLock()
+_seen = None              # Liste in Reihenfolge des ersten Auftretens
+_seen_set = set()
+_unsaved = 0
+_flush_timer = None
+_matcher = InstitutionMatcher()
+
+
+def _read_institutions_file():
     if os.path.exists(INSTITUTIONS_FILE):
         with open(INSTITUTIONS_FILE, "r", encoding="utf-8") as f:
             return json.load(f)
     return []
 
 
+def _ensure_registry():
+    """Lädt institutions_seen.json einmalig und baut den Automaten auf."""
+    global _seen
+    if _seen is not None:
+        return
+    with _registry_lock:
+        if _seen is not None:
+            return
+        for i, inst in enumerate(KNOWN_INSTITUTIONS):
+            _matcher.add(inst, (0, i))
+        seen = []
+        for inst in _read_institutions_file():
+            if inst not in _seen_set:
+                _seen_set.add(inst)
+                _matcher.add(inst, (1, len(seen)))
+                seen.append(inst)
+        _matcher.rebuild()
+        _seen = seen
+
+
+def load_institutions():
+    _ensure_registry()
+    with _registry_lock:
+        return list(_seen)
+
+
+def flush_institutions():
+    """
+    Schreibt neue Namen nach institutions_seen.json (atomar).
+    Namen, die andere Prozesse inzwischen gespeichert haben, bleiben erhalten –
+    Lesen, Zusammenführen und Ersetzen laufen unter einer prozessübergreifenden Sperre.
+    """
+    global _unsaved, _flush_timer
+    with _registry_lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        if not _unsaved:
+            return
+
+        # Neue Namen gebündelt in den Automaten übernehmen
+        _matcher.rebuild()
+
+        with timed("institutions_flush"), file_lock(INSTITUTIONS_FILE):
+            data = _read_institutions_file()
+            on_disk = set(data)
+            data.extend(inst for inst in _seen if inst not in on_disk)
+
+            tmp_path = f"{INSTITUTIONS_FILE}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, INSTITUTIONS_FILE)
+        _unsaved = 0
+
+
 def save_institution(name: str):
-    data = load_institutions()
-    if name not in data:
-        data.append(name)
-        with open(INSTITUTIONS_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    global _unsaved, _flush_timer
+    _ensure_registry()
+    with _registry_lock:
+        if name in _seen_set:
+            return
+        _seen_set.add(name)
+        _matcher.add(name, (1, len(_seen)))
+        _seen.append(name)
+        _unsaved += 1
+
+        if _unsaved >= FLUSH_EVERY:
+            flush_institutions()
+        elif _flush_timer is None:
+            _flush_timer = threading.Timer(FLUSH_INTERVAL, flush_institutions)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+
+
+atexit.register(flush_institutions)
 
 
 # ============================================================
 # 🔎 Institution extrahieren
 # ============================================================
-def extract_institution(text: str) -> str:
-    if not text:
-        return "_Unklar"
+def _match_known(text: str):
+    # 1️⃣ Bekannte, 2️⃣ bereits gesehene Institutionen – ein Durchlauf über den Text
+    _ensure_registry()
+    with _registry_lock:
+        return _matcher.find_best(text.lower())
 
-    text_lower = text.lower()
 
-    # 1️⃣ Bekannte Institutionen prüfen
-    for inst in KNOWN_INSTITUTIONS:
-        if inst.lower() in text_lower:
-            return inst
-
-    # 2️⃣ Bereits gesehene Institutionen
-    for inst in load_institutions():
-        if inst.lower() in text_lower:
-            return inst
-
-    # 3️⃣ Mit spaCy NER Institutionen erkennen
-    doc = nlp(text)
+def _pick_org(doc) -> str:
+    """Wählt aus den ORG-Entitäten eines spaCy-Dokuments die Institution."""
     orgs = [ent.text.strip() for ent in doc.ents if ent.label_ == "ORG"]
 
     # 🔎 Nur sinnvolle ORGs behalten
@@ -97,6 +225,61 @@ def extract_institution(text: str) -> str:
     return candidate
 
 
+def extract_institution(text: str) -> str:
+    if not text:
+        CLASSIFIED.inc(method="empty")
+        return "_Unklar"
+
+    with timed("match_known"):
+        known = _match_known(text)
+    if known:
+        CLASSIFIED.inc(method="known")
+        return known
+
+    # 3️⃣ Mit spaCy NER Institutionen erkennen (nur Briefkopf)
+    nlp = get_nlp()
+    with timed("ner"):
+        doc = nlp(_header(text))
+    CLASSIFIED.inc(method="ner")
+    return _pick_org(doc)
+
+
+def extract_institutions(texts: list) -> list:
+    """
+    Batch-Variante für Massenimport / Neuklassifizierung.
+    Alle Texte ohne bekannten Namen laufen gemeinsam durch nlp.pipe.
+
+    Returns:
+        list[str]: Institution je Text (gleiche Reihenfolge)
+    """
+    results = [None] * len(texts)
+    pending = []
+    for i, text in enumerate(texts):
+        if not text:
+            results[i] = "_Unklar"
+            CLASSIFIED.inc(method="empty")
+        else:
+            results[i] = _match_known(text)
+            if results[i]:
+                CLASSIFIED.inc(method="known")
+            else:
+                pending.append(i)
+
+    if pending:
+        nlp = get_nlp()
+        start = time.perf_counter()
+        docs = nlp.pipe((_header(texts[i]) for i in pending), batch_size=NER_BATCH_SIZE)
+        for i, doc in zip(pending, docs):
+            results[i] = _pick_org(doc)
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage="ner_batch")
+        CLASSIFIED.inc(len(pending), method="ner")
+        log.info("NER-Batch", extra={"documents": len(pending), "seconds": round(elapsed, 2),
+                                     "ms_per_document": round(elapsed / len(pending) * 1000)})
+
+    return results
+
+
 # ============================================================
 # 🧪 Testlauf
 # ============================================================
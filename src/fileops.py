@@ -4,19 +4,149 @@
 # Logik: Immer aktuelles Jahr (Systemzeit), Dateiname bleibt unverändert
 # ==========================================================
 
+import errno
+import hashlib
+import logging
 import os
+import re
 import shutil
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
 
+from metrics import counter, timed
+
 # 📌 Basisverzeichnis = Desktop/AutoDocOrganizer/Archive
 USER_HOME = os.path.expanduser("~")
 DESKTOP_DIR = os.path.join(USER_HOME, "Desktop")
 ARCHIVE_DIR = os.path.join(DESKTOP_DIR, "AutoDocOrganizer", "Archive")
 INDEX_FILE = os.path.join(ARCHIVE_DIR, "index.csv")
 
+# 📌 Caches (OCR-Texte etc.) und Index-Datenbank liegen neben dem Archiv, nicht darin
+CACHE_DIR = os.path.join(DESKTOP_DIR, "AutoDocOrganizer", "Cache")
+INDEX_DB = os.path.join(DESKTOP_DIR, "AutoDocOrganizer", "index.db")
+
 # Stelle sicher, dass Hauptordner existiert
 os.makedirs(ARCHIVE_DIR, exist_ok=True)
 
+log = logging.getLogger(__name__)
+
+# 📊 Archivierte Dateien nach Art der Ablage (moved / copied / copy_only)
+ARCHIVED = counter("autodoc_archived_files_total", "Ins Archiv übernommene Dateien", ("mode",))
+
+
+def file_hash(filepath: str) -> str:
+    """
+    Berechnet den SHA-256-Hash des Dateiinhalts (blockweise gelesen).
+    Der Hash bleibt bei Verschieben/Umbenennen gleich.
+    """
+    digest = hashlib.sha256()
+    with timed("file_hash"), open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ============================================================
+# 🔒 Prozessübergreifende Sperre (App, Watcher und Importer gleichzeitig)
+# ============================================================
+@contextmanager
+def file_lock(path: str, timeout: float = 30.0):
+    """
+    Exklusive Sperre über eine Datei <path>.lock (fcntl bzw. msvcrt unter Windows).
+    Schützt Lesen-Ändern-Schreiben gemeinsamer Dateien wie institutions_seen.json.
+
+    Raises:
+        TimeoutError: wenn die Sperre nicht innerhalb von timeout Sekunden frei wird
+    """
+    lock_path = path + ".lock"
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if os.name == "nt":
+                    import msvcrt
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                else:
+                    import fcntl
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except OSError as e:
+                if e.errno not in (errno.EACCES, errno.EAGAIN, errno.EDEADLK):
+                    raise
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Sperre {lock_path} nicht frei nach {timeout} s") from e
+                time.sleep(0.02)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                import msvcrt
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+# ⚡ Nächster freier Zähler je (Ordner, Name, Endung) → kein Durchprobieren von (1), (2), ...
+_name_counters = {}
+_name_lock = threading.Lock()
+
+
+def _next_counter_on_disk(target_dir: str, base: str, ext: str) -> int:
+    """Einmaliger Ordner-Scan: höchster vorhandener Zähler + 1."""
+    pattern = re.compile(re.escape(base) + r" \((\d+)\)" + re.escape(ext) + "$")
+    highest = 0
+    with os.scandir(target_dir) as entries:
+        for entry in entries:
+            match = pattern.match(entry.name)
+            if match:
+                highest = max(highest, int(match.group(1)))
+    return highest + 1
+
+
+def _reserve(path: str) -> bool:
+    """Legt path als leere Platzhalterdatei an – atomar, False, falls schon vorhanden."""
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+        return True
+    except FileExistsError:
+        return False
+
+
+def _free_target_path(target_dir: str, filename: str) -> str:
+    """
+    Reserviert einen freien Zielpfad: Datei.pdf, sonst Datei (n).pdf.
+    Der Name wird per O_EXCL als Platzhalter angelegt, damit zwei Prozesse
+    (App, Watcher, Importer) nie denselben Namen wählen und sich überschreiben.
+    Der Zähler wird pro Prozess gemerkt, der Ordner nur beim ersten Konflikt gelesen.
+    """
+    base, ext = os.path.splitext(filename)
+    target_path = os.path.join(target_dir, filename)
+    key = (target_dir, base, ext)
+
+    with _name_lock:
+        counter = _name_counters.get(key)
+        if counter is None:
+            if _reserve(target_path):
+                _name_counters[key] = 1
+                return target_path
+            counter = _next_counter_on_disk(target_dir, base, ext)
+
+        # Normalfall: erster Kandidat ist frei (nur andere Prozesse können dazwischenfunken)
+        target_path = os.path.join(target_dir, f"{base} ({counter}){ext}")
+        while not _reserve(target_path):
+            counter += 1
+            target_path = os.path.join(target_dir, f"{base} ({counter}){ext}")
+
+        _name_counters[key] = counter + 1
+        return target_path
+
 
 def move_to_archive(filepath: str, institution: str = "_Unklar") -> str:
     """
@@ -30,6 +160,11 @@ def move_to_archive(filepath: str, institution: str = "_Unklar") -> str:
     Returns:
         str: Neuer Zielpfad im Archiv
     """
+    with timed("move_to_archive"):
+        return _move_to_archive(filepath, institution)
+
+
+def _move_to_archive(filepath: str, institution: str) -> str:
     if not os.path.exists(filepath):
         raise FileNotFoundError(f"❌ Datei nicht gefunden: {filepath}")
 
@@ -44,30 +179,45 @@ def move_to_archive(filepath: str, institution: str = "_Unklar") -> str:
     target_dir = os.path.join(ARCHIVE_DIR, year, institution)
     os.makedirs(target_dir, exist_ok=True)
 
-    # Ursprünglichen Dateinamen bestimmen
-    filename = os.path.basename(filepath)
-    base, ext = os.path.splitext(filename)
-    target_path = os.path.join(target_dir, filename)
+    # ⚡ Kollisionen auflösen → Datei (1).pdf, Datei (2).pdf (Name ist danach reserviert)
+    target_path = _free_target_path(target_dir, os.path.basename(filepath))
+
+    try:
+        return _place_file(filepath, target_path)
+    except Exception:
+        # Fehlgeschlagen → keinen leeren Platzhalter im Archiv zurücklassen
+        try:
+            if os.path.getsize(target_path) == 0:
+                os.remove(target_path)
+        except OSError:
+            pass
+        raise
 
-    # ⚡ Kollisionen auflösen → Datei (1).pdf, Datei (2).pdf
-    counter = 1
-    while os.path.exists(target_path):
-        target_path = os.path.join(target_dir, f"{base} ({counter}){ext}")
-        counter += 1
 
+def _place_file(filepath: str, target_path: str) -> str:
+    """Verschiebt die Datei auf den reservierten Zielpfad (ersetzt den Platzhalter atomar)."""
     # 🚚 Datei verschieben oder kopieren (falls blockiert)
     try:
-        shutil.move(filepath, target_path)
-        print(f"📦 Verschoben nach: {target_path}")
+        try:
+            os.replace(filepath, target_path)
+        except PermissionError:
+            raise
+        except OSError:
+            shutil.move(filepath, target_path)  # anderes Laufwerk: kopieren + löschen
+        ARCHIVED.inc(mode="moved")
+        log.info("Verschoben ins Archiv", extra={"path": target_path})
     except PermissionError:
         temp_target = target_path + ".part"
         shutil.copy2(filepath, temp_target)
         try:
             os.remove(filepath)
-            os.rename(temp_target, target_path)
-            print(f"⚠️ Datei blockiert, Kopie erstellt und umbenannt → {target_path}")
+            os.replace(temp_target, target_path)
+            ARCHIVED.inc(mode="copied")
+            log.warning("Datei blockiert, Kopie erstellt und umbenannt", extra={"path": target_path})
         except PermissionError:
-            print(f"⚠️ Datei blockiert, nur Kopie gespeichert → {temp_target}")
+            ARCHIVED.inc(mode="copy_only")
+            log.warning("Datei blockiert, nur Kopie gespeichert", extra={"path": temp_target})
+            os.remove(target_path)  # Platzhalter wieder freigeben
             target_path = temp_target
 
     return target_path
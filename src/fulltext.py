@@ -0,0 +1,308 @@
+# ==========================================================
+# 🔎 Volltextsuche für AutoDocOrganizer
+# Invertierter Index (SQLite FTS5, BM25) über den OCR-Text aller Dokumente
+# Liegt in index.db neben den Metadaten, wird bei jeder Ablage ergänzt
+# Dokumente, von denen erst der Briefkopf erkannt ist, stehen in fulltext_pending
+# ==========================================================
+
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from indexer import get_connection, submit_write
+from metrics import gauge, timed
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fulltext_docs (
+    id   INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    text TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS fulltext USING fts5(
+    terms,
+    tokenize = 'unicode61 remove_diacritics 0'
+);
+CREATE TABLE IF NOT EXISTS fulltext_pending (
+    path   TEXT PRIMARY KEY,
+    sha256 TEXT,
+    lang   TEXT,
+    queued REAL NOT NULL
+);
+"""
+
+log = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# 🛑 Häufige Wörter ohne Suchwert (Deutsch + Englisch)
+STOPWORDS = {
+    "der", "die", "das", "den", "dem", "des", "ein", "eine", "einer", "eines", "einem", "einen",
+    "und", "oder", "aber", "als", "auch", "auf", "aus", "bei", "bis", "da", "dass", "durch",
+    "fur", "im", "in", "ist", "mit", "nach", "nicht", "noch", "nur", "sie", "sich", "so",
+    "sind", "um", "uber", "von", "vom", "vor", "war", "wie", "wir", "wird", "zu", "zum", "zur",
+    "ich", "ihr", "ihre", "ihren", "ihnen", "es", "er", "an", "am", "wenn", "werden", "wurde",
+    "the", "a", "an", "and", "or", "of", "to", "in", "on", "for", "is", "are", "was", "be",
+    "by", "with", "at", "from", "this", "that", "it", "as", "your", "you", "we", "our",
+}
+
+# Endungen für einfaches Stemming (längste zuerst)
+_SUFFIXES = ("ungen", "ing", "en", "er", "es", "ed", "e", "n", "s")
+
+SNIPPET_CHARS = 160
+
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+# ============================================================
+# ✂️ Tokenisierung (Deutsch/Englisch)
+# ============================================================
+def _normalize(token: str) -> str:
+    """Kleinschreibung, ß → ss, Umlaute/Akzente entfernen (OCR liefert oft 'fur' statt 'für')."""
+    token = token.lower().replace("ß", "ss")
+    token = unicodedata.normalize("NFKD", token)
+    return "".join(ch for ch in token if not unicodedata.combining(ch))
+
+
+def _stem(token: str) -> str:
+    """Leichtes Stemming: Rechnungen → rechn, Rechnung → rechn, bills → bill."""
+    if token.isdigit():
+        return token
+    for suffix in _SUFFIXES:
+        if len(token) - len(suffix) >= 4 and token.endswith(suffix):
+            token = token[:-len(suffix)]
+            break
+    if token.endswith("ung") and len(token) >= 7:
+        token = token[:-3]
+    return token
+
+
+def _tokens(text: str):
+    """Liefert (normalisiertes Wort, Stamm) je Wort, ohne Stoppwörter."""
+    for match in TOKEN_RE.finditer(text or ""):
+        token = _normalize(match.group())
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        yield token, _stem(token)
+
+
+def tokenize(text: str) -> list:
+    """
+    Zerlegt Text in normalisierte Suchbegriffe (Stämme, ohne Stoppwörter).
+    Returns:
+        list[str]: Begriffe in Textreihenfolge
+    """
+    return [stem for _, stem in _tokens(text)]
+
+
+def _index_terms(text: str) -> str:
+    """Stamm + vollständiges Wort indexieren, damit auch Präfixe beim Tippen treffen."""
+    terms = []
+    for token, stem in _tokens(text):
+        terms.append(stem)
+        if token != stem:
+            terms.append(token)
+    return " ".join(terms)
+
+
+# ============================================================
+# 🔌 Schema
+# ============================================================
+def _connection():
+    global _schema_ready
+    conn = get_connection()
+    if not _schema_ready:
+        with _schema_lock:
+            if not _schema_ready:
+                conn.executescript(_SCHEMA)
+                _schema_ready = True
+    return conn
+
+
+# ============================================================
+# ✍️ Indexieren
+# ============================================================
+def index_document(path: str, text: str, partial: bool = False, content_hash: str = None,
+                   ocr_lang: str = None):
+    """
+    Nimmt den OCR-Text eines archivierten Dokuments in den Volltextindex auf
+    (ersetzt einen vorhandenen Eintrag mit gleichem Pfad).
+    partial=True: erst der Briefkopf ist erkannt; Hash und OCR-Sprachen werden für
+    die spätere vollständige OCR vorgemerkt (→ pipeline.complete_document).
+    """
+    terms = _index_terms(text)
+    _connection()  # Schema anlegen, bevor der Schreib-Thread schreibt
+
+    def write(conn):
+        if partial:
+            conn.execute("INSERT OR REPLACE INTO fulltext_pending (path, sha256, lang, queued) VALUES (?, ?, ?, ?)",
+                         (path, content_hash, ocr_lang, time.time()))
+        else:
+            conn.execute("DELETE FROM fulltext_pending WHERE path = ?", (path,))
+        row = conn.execute("SELECT id FROM fulltext_docs WHERE path = ?", (path,)).fetchone()
+        if row:
+            conn.execute("DELETE FROM fulltext WHERE rowid = ?", (row["id"],))
+            conn.execute("UPDATE fulltext_docs SET text = ? WHERE id = ?", (text, row["id"]))
+            doc_id = row["id"]
+        else:
+            doc_id = conn.execute("INSERT INTO fulltext_docs (path, text) VALUES (?, ?)",
+                                  (path, text)).lastrowid
+        conn.execute("INSERT INTO fulltext (rowid, terms) VALUES (?, ?)", (doc_id, terms))
+
+    submit_write(write)
+
+
+def remove_document(path: str):
+    """Entfernt ein Dokument aus dem Volltextindex (z. B. nach dem Löschen)."""
+    _connection()
+
+    def write(conn):
+        conn.execute("DELETE FROM fulltext_pending WHERE path = ?", (path,))
+        row = conn.execute("SELECT id FROM fulltext_docs WHERE path = ?", (path,)).fetchone()
+        if row:
+            conn.execute("DELETE FROM fulltext WHERE rowid = ?", (row["id"],))
+            conn.execute("DELETE FROM fulltext_docs WHERE id = ?", (row["id"],))
+
+    submit_write(write)
+
+
+def get_text(path: str):
+    """Gespeicherter OCR-Text eines Dokuments (None, wenn nicht im Volltextindex)."""
+    row = _connection().execute("SELECT text FROM fulltext_docs WHERE path = ?", (path,)).fetchone()
+    return row["text"] if row else None
+
+
+# ============================================================
+# ⏳ Dokumente mit ausstehender vollständiger OCR
+# ============================================================
+def get_pending(path: str):
+    """
+    Returns:
+        dict | None: {"path", "sha256", "lang", "queued"}, solange nur der Briefkopf indexiert ist
+    """
+    row = _connection().execute(
+        "SELECT path, sha256, lang, queued FROM fulltext_pending WHERE path = ?", (path,)
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def pending_documents(limit: int = -1) -> list:
+    """Pfade mit ausstehender vollständiger OCR, älteste zuerst."""
+    rows = _connection().execute(
+        "SELECT path FROM fulltext_pending ORDER BY queued LIMIT ?", (limit,)
+    ).fetchall()
+    return [r["path"] for r in rows]
+
+
+def pending_among(paths: list) -> set:
+    """Welche der Pfade (z. B. Suchtreffer) sind erst teilweise indexiert?"""
+    paths = list(paths)
+    found = set()
+    for i in range(0, len(paths), 500):  # SQLite-Grenze für Platzhalter
+        chunk = paths[i:i + 500]
+        rows = _connection().execute(
+            f"SELECT path FROM fulltext_pending WHERE path IN ({','.join('?' * len(chunk))})", chunk
+        ).fetchall()
+        found.update(r["path"] for r in rows)
+    return found
+
+
+def count_pending() -> int:
+    return _connection().execute("SELECT COUNT(*) FROM fulltext_pending").fetchone()[0]
+
+
+gauge("autodoc_fulltext_pending", "Archivierte Dokumente, deren vollständige OCR noch aussteht",
+      func=count_pending)
+
+
+# ============================================================
+# 🔍 Suchen
+# ============================================================
+def _match_query(terms: list, prefix: str) -> str:
+    parts = [f'"{t}"' for t in terms]
+    if prefix:
+        parts.append(f'"{prefix}"*')
+    return " ".join(parts)
+
+
+def _snippet(text: str, terms: list, prefix: str) -> str:
+    """Textausschnitt um den ersten Treffer (Originaltext, nicht normalisiert)."""
+    wanted = set(terms)
+    for match in TOKEN_RE.finditer(text):
+        token = _normalize(match.group())
+        if _stem(token) in wanted or (prefix and token.startswith(prefix)):
+            start = max(0, match.start() - SNIPPET_CHARS // 2)
+            end = min(len(text), start + SNIPPET_CHARS)
+            snippet = " ".join(text[start:end].split())
+            return ("…" if start > 0 else "") + snippet + ("…" if end < len(text) else "")
+    return " ".join(text[:SNIPPET_CHARS].split())
+
+
+def search_fulltext(query: str, limit: int = 20, offset: int = 0) -> list:
+    """
+    BM25-gerankte Volltextsuche. Alle Begriffe müssen vorkommen,
+    der letzte Begriff darf unvollständig sein (Suche beim Tippen).
+
+    Returns:
+        list[dict]: {"path", "filename", "year", "institution", "score", "snippet"}
+    """
+    tokens = list(_tokens(query))
+    if not tokens:
+        return []
+
+    # Letztes Wort als Präfix, solange noch getippt wird
+    prefix = ""
+    if not query.endswith(" "):
+        prefix = tokens.pop()[0]
+    terms = [stem for _, stem in tokens]
+
+    with timed("search_fulltext"):
+        records = _connection().execute(
+            """
+            SELECT d.path, d.text, bm25(fulltext) AS score,
+                   doc.filename, doc.year, doc.institution
+            FROM fulltext
+            JOIN fulltext_docs d ON d.id = fulltext.rowid
+            LEFT JOIN documents doc ON doc.path = d.path
+            WHERE fulltext MATCH ?
+            ORDER BY score
+            LIMIT ? OFFSET ?
+            """,
+            (_match_query(terms, prefix), limit, offset),
+        ).fetchall()
+
+    return [{
+        "path": r["path"],
+        "filename": r["filename"] or os.path.basename(r["path"]),
+        "year": r["year"],
+        "institution": r["institution"],
+        "score": round(-r["score"], 6),
+        "snippet": _snippet(r["text"], terms, prefix),
+    } for r in records]
+
+
+# ============================================================
+# 🔁 Bestehendes Archiv nachindexieren
+# ============================================================
+def reindex_archive():
+    """
+    Nimmt alle Index-Einträge ohne Volltext auf (OCR kommt meist aus dem Cache).
+    """
+    from indexer import read_index
+    from ocr import run_ocr
+
+    conn = _connection()
+    known = {r["path"] for r in conn.execute("SELECT path FROM fulltext_docs")}
+    missing = [row["Pfad"] for row in read_index()
+               if row["Pfad"] not in known and os.path.exists(row["Pfad"])]
+
+    for i, path in enumerate(missing, start=1):
+        index_document(path, run_ocr(path))
+        log.info("Volltext indexiert", extra={"done": i, "total": len(missing), "path": path})
+
+
+if __name__ == "__main__":
+    reindex_archive()
@@ -1,41 +1,240 @@
 # 📥 Import-Modul für AutoDocOrganizer
 # Ermöglicht es, bestehende Dateien vom PC zu importieren
 # und direkt durch den Verarbeitungs-Workflow zu schicken.
+# Ganze Ordnerbäume: parallel auf mehrere Prozesse verteilt,
+# mit Checkpoint-Datei zum Fortsetzen nach Abbruch.
+#
+# Aufruf: python importer.py <Datei oder Ordner> [--workers N] [--manifest pfad.jsonl] [--lang deu+ron]
 
+import argparse
+import hashlib
+import json
+import logging
 import os
-from datetime import datetime
-from ocr import run_ocr
-from extract_institution import extract_institution   # ⚡ vereinheitlicht
-from fileops import move_to_archive
-from indexer import update_index
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 
-def import_file(filepath: str):
+from config import get_setting
+from extract_institution import flush_institutions
+from fileops import CACHE_DIR
+from fulltext import pending_among
+from language import normalize_lang
+from logs import configure_logging
+from pipeline import complete_document, process_document
+
+# 📄 Unterstützte Dateitypen
+IMPORT_EXTENSIONS = (".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")
+
+IMPORT_WORKERS = int(get_setting("importer", "workers", 0)) or os.cpu_count() or 1
+
+log = logging.getLogger(__name__)
+
+
+def import_file(filepath: str, ocr_lang: str = None):
     if not os.path.exists(filepath):
-        print(f"❌ Datei nicht gefunden: {filepath}")
+        log.error("Datei nicht gefunden", extra={"path": filepath})
         return
-    
-    print(f"📥 Importierte Datei: {filepath}")
-    text = run_ocr(filepath)
 
-    # 🏢 Institution erkennen (Fallback = "_Unklar")
-    inst = extract_institution(text) or "_Unklar"
+    log.info("Importiere Datei", extra={"path": filepath})
+
+    # 📝 OCR → Institution → Archiv → Index
+    result = process_document(filepath, ocr_lang)
+    log.info("Import abgeschlossen", extra={"path": result["path"], "institution": result["institution"]})
+
+    # ⏳ Erst nach dem Ablegen: vollständige OCR für die Volltextsuche
+    if result["deferred"]:
+        ocr = complete_document(result["path"])
+        if ocr is not None:
+            result["pages"] = len(ocr["pages"])
+    return result
+
+
+# ============================================================
+# 📚 Massenimport ganzer Ordner
+# ============================================================
+def _default_manifest(root: str) -> str:
+    """Checkpoint-Datei je Importordner, liegt im Cache (nicht im Kundenordner)."""
+    digest = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, "imports", f"{digest}.jsonl")
+
+
+def _load_manifest(manifest: str) -> set:
+    """Liest bereits erfolgreich importierte Quellpfade (abgebrochene Zeilen werden ignoriert)."""
+    done = set()
+    if not os.path.exists(manifest):
+        return done
+    with open(manifest, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("status") == "done":
+                done.add(entry["src"])
+    return done
+
+
+def _collect_files(root: str, done: set) -> list:
+    files = []
+    for dirpath, _, filenames in os.walk(root):
+        for fname in sorted(filenames):
+            path = os.path.join(dirpath, fname)
+            if fname.lower().endswith(IMPORT_EXTENSIONS) and path not in done:
+                files.append(path)
+    return files
+
+
+def _init_worker():
+    # Seitenparallele OCR aus: die Parallelität kommt hier von den Import-Prozessen
+    import ocr
+    import pipeline
+    ocr.OCR_PARALLEL = False
+    # Vollständige OCR nicht in Hintergrund-Threads der Worker (gingen beim Beenden verloren),
+    # sondern als zweite Phase von bulk_import
+    pipeline.COMPLETE_IN_BACKGROUND = False
+    configure_logging()
+
+
+def _import_worker(filepath: str, ocr_lang: str = None) -> dict:
+    try:
+        result = process_document(filepath, ocr_lang)
+        return {"src": filepath, "status": "done", **result}
+    except Exception as e:
+        return {"src": filepath, "status": "error", "error": str(e)}
+    finally:
+        # Worker-Prozesse führen keine atexit-Handler aus → neue Institutionen sofort speichern
+        flush_institutions()
 
-    # 📅 Jahr bestimmen (Fallback = aktuelles Jahr)
-    year = str(datetime.now().year)
-    for token in text.split():
-        if token.isdigit() and len(token) == 4:
-            year = token
-            break
 
-    # 📦 Datei direkt ins strukturierte Archiv verschieben
-    archive_path = move_to_archive(filepath, inst, year)
+def _complete_worker(path: str) -> int:
+    """Vollständige OCR eines Dokuments; liefert die Seitenzahl (0 = nicht erledigt)."""
+    try:
+        ocr = complete_document(path)
+        return len(ocr["pages"]) if ocr else 0
+    except Exception as e:
+        log.error("Vollständige OCR fehlgeschlagen", extra={"path": path, "error": str(e)})
+        return 0
+    finally:
+        flush_institutions()
 
-    # 📝 Index aktualisieren
-    update_index(archive_path, year, inst)
 
-    print(f"✅ Import abgeschlossen → {archive_path}")
+def _format_eta(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def bulk_import(root: str, workers: int = IMPORT_WORKERS, manifest: str = None, ocr_lang: str = None) -> dict:
+    """
+    Importiert alle Dokumente unterhalb von root parallel.
+    Jeder abgeschlossene Import wird sofort in die Manifest-Datei (JSON Lines)
+    geschrieben; ein erneuter Aufruf überspringt bereits importierte Dateien.
+    Dokumente, die per Briefkopf abgelegt wurden, bekommen ihre vollständige OCR
+    in einer zweiten Phase – das ganze Archiv ist also früh sortiert. Ihre Seiten
+    zählen erst dort (pages, pages_per_min).
+
+    Returns:
+        dict: {"done": int, "errors": int, "pages": int, "completed": int, "seconds": float}
+    """
+    manifest = manifest or _default_manifest(root)
+    os.makedirs(os.path.dirname(os.path.abspath(manifest)), exist_ok=True)
+
+    done_before = _load_manifest(manifest)
+    files = _collect_files(root, done_before)
+    total = len(files)
+    log.info("Massenimport gestartet", extra={"files": total, "already_done": len(done_before),
+                                              "workers": workers, "manifest": manifest})
+
+    stats = {"done": 0, "errors": 0, "pages": 0, "completed": 0, "seconds": 0.0}
+    if not total:
+        return stats
+
+    start = time.perf_counter()
+    pending = iter(files)
+    in_flight = set()
+    imported = []   # Archivpfade dieses Laufs (nur diese bekommen in Phase 2 die vollständige OCR)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool, \
+            open(manifest, "a", encoding="utf-8") as checkpoint:
+
+        def fill():
+            # Nur begrenzt viele Aufträge gleichzeitig einreihen (Speicher bei 30k+ Dateien)
+            while len(in_flight) < workers * 2:
+                path = next(pending, None)
+                if path is None:
+                    return
+                in_flight.add(pool.submit(_import_worker, path, ocr_lang))
+
+        fill()
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                in_flight.discard(future)
+                entry = future.result()
+                checkpoint.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                checkpoint.flush()
+
+                if entry["status"] == "done":
+                    stats["done"] += 1
+                    if entry.get("deferred"):
+                        imported.append(entry["path"])
+                    stats["pages"] += entry.get("pages", 0)
+                else:
+                    stats["errors"] += 1
+                    log.error("Import fehlgeschlagen", extra={"path": entry["src"], "error": entry["error"]})
+
+                # 📈 Fortschritt: Dokumente/Seiten pro Minute + Restzeit
+                processed = stats["done"] + stats["errors"]
+                elapsed = time.perf_counter() - start
+                docs_per_min = processed / elapsed * 60
+                pages_per_min = stats["pages"] / elapsed * 60
+                eta = (total - processed) / (processed / elapsed)
+                log.info("Fortschritt", extra={"processed": processed, "total": total,
+                                               "docs_per_min": round(docs_per_min, 1),
+                                               "pages_per_min": round(pages_per_min, 1),
+                                               "eta": _format_eta(eta)})
+            fill()
+
+        # ⏳ Phase 2: vollständige OCR für die in diesem Lauf nur per Briefkopf abgelegten Dokumente
+        # (ältere ausstehende Dokumente holen App und Watcher nach, siehe resume_pending)
+        still_pending = pending_among(imported)
+        deferred = [path for path in imported if path in still_pending]
+        if deferred:
+            log.info("Alle Dateien abgelegt, vollständige OCR folgt",
+                     extra={"files": len(deferred), "archived_after": _format_eta(time.perf_counter() - start)})
+            phase_start = time.perf_counter()
+            phase_pages = 0
+            for i, pages in enumerate(pool.map(_complete_worker, deferred, chunksize=4), start=1):
+                stats["completed"] += pages > 0
+                stats["pages"] += pages
+                phase_pages += pages
+
+                elapsed = time.perf_counter() - phase_start
+                log.info("Fortschritt OCR", extra={"processed": i, "total": len(deferred),
+                                                   "pages_per_min": round(phase_pages / elapsed * 60, 1),
+                                                   "eta": _format_eta((len(deferred) - i) / (i / elapsed))})
+
+    stats["seconds"] = time.perf_counter() - start
+    log.info("Massenimport fertig", extra={"done": stats["done"], "errors": stats["errors"],
+                                           "pages": stats["pages"], "completed": stats["completed"],
+                                           "pages_per_min": round(stats["pages"] / stats["seconds"] * 60, 1),
+                                           "duration": _format_eta(stats["seconds"])})
+    return stats
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dateien oder ganze Ordner ins Archiv importieren")
+    parser.add_argument("path", nargs="?", help="Datei oder Ordner")
+    parser.add_argument("--workers", type=int, default=IMPORT_WORKERS, help="Anzahl Import-Prozesse")
+    parser.add_argument("--manifest", help="Checkpoint-Datei (Standard: im Cache-Ordner)")
+    parser.add_argument("--lang", type=normalize_lang, help="OCR-Sprachen, z. B. deu oder deu+ron (Standard: automatisch)")
+    args = parser.parse_args()
+    configure_logging()
+
     # Beispiel: direkt testen
-    testfile = input("Gib den Pfad zur Datei ein: ")
-    import_file(testfile.strip('"'))
+    target = args.path or input("Gib den Pfad zur Datei ein: ")
+    target = target.strip('"')
+    if os.path.isdir(target):
+        bulk_import(target, workers=args.workers, manifest=args.manifest, ocr_lang=args.lang)
+    else:
+        import_file(target, args.lang)
@@ -1,78 +1,542 @@
 # ==========================================================
 # 📝 Indexverwaltung für AutoDocOrganizer
-# Speichert Metadaten aller archivierten Dateien in index.csv
+# Speichert Metadaten aller archivierten Dateien in index.db (SQLite, WAL)
 # Logik: Jahr = immer aktuelles Jahr (datetime.now().year)
+# Alte index.csv wird beim ersten Zugriff einmalig übernommen
+# Schreiben: BEGIN IMMEDIATE (prozessübergreifend serialisiert), je Prozess ein
+# Schreib-Thread, der gleichzeitig eintreffende Änderungen gemeinsam committet
 # ==========================================================
 
 import csv
+import logging
 import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
 from datetime import datetime
-from fileops import INDEX_FILE
+from functools import lru_cache
 
+from config import get_setting
+from fileops import INDEX_FILE, INDEX_DB, file_hash
+from metrics import counter, gauge, histogram, timed
 
-def update_index(filepath: str, institution: str):
+FIELDNAMES = ["Datei", "Jahr", "Institution", "Pfad"]
+
+log = logging.getLogger(__name__)
+
+# 🔧 Schreibzugriffe (config/settings.yml → index)
+GROUP_COMMIT = bool(get_setting("index", "group_commit", True))
+GROUP_COMMIT_MAX = int(get_setting("index", "group_commit_max", 256))   # Aufträge pro Commit
+BUSY_TIMEOUT = float(get_setting("index", "busy_timeout", 30))          # Sekunden Warten auf die Sperre
+WRITE_RETRIES = int(get_setting("index", "write_retries", 5))           # danach noch so oft neu versuchen
+
+# 📊 Geschriebene Einträge; Gesamtzahl wird erst beim Export abgefragt
+ROWS_WRITTEN = counter("autodoc_index_rows_written_total", "In index.db geschriebene Einträge")
+COMMITS = counter("autodoc_index_commits_total", "Schreibtransaktionen auf index.db")
+BUSY_RETRIES = counter("autodoc_index_busy_retries_total", "Wiederholte Schreibversuche wegen gesperrter index.db")
+BATCH_SIZE = histogram("autodoc_index_commit_batch_size", "Schreibaufträge je gemeinsamem Commit",
+                       buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    path        TEXT PRIMARY KEY,
+    filename    TEXT NOT NULL,
+    year        TEXT NOT NULL,
+    institution TEXT NOT NULL,
+    updated     REAL NOT NULL,
+    sha256      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_documents_year ON documents(year);
+CREATE INDEX IF NOT EXISTS idx_documents_institution ON documents(institution);
+CREATE INDEX IF NOT EXISTS idx_documents_filename ON documents(filename);
+CREATE INDEX IF NOT EXISTS idx_documents_sha256 ON documents(sha256);
+CREATE INDEX IF NOT EXISTS idx_documents_filename_nocase ON documents(filename COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_documents_institution_nocase ON documents(institution COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_search USING fts5(
+    filename, institution, year,
+    tokenize = 'trigram'
+);
+"""
+
+_UPSERT = """
+INSERT INTO documents (path, filename, year, institution, updated, sha256)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(path) DO UPDATE SET
+    filename = excluded.filename,
+    year = excluded.year,
+    institution = excluded.institution,
+    updated = excluded.updated,
+    sha256 = COALESCE(excluded.sha256, documents.sha256)
+"""
+
+# 🔎 Teilstring-Suche in Dateiname/Institution/Jahr über einen Trigramm-Index
+# (rowid = documents.rowid, Werte in Vergleichsform); kürzere Anfragen (z. B. "TK")
+# treffen Institution exakt bzw. den Anfang des Dateinamens (NOCASE-Indizes)
+SEARCH_MIN_CHARS = 3
+
+def _fold(value):
+    """Vergleichsform: NFC-normalisiert und kleingeschrieben (ö == ö, auch aus macOS-Dateinamen)."""
+    return unicodedata.normalize("NFC", value).lower() if isinstance(value, str) else value
+
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+
+# ============================================================
+# 🔌 Verbindung & Schema
+# ============================================================
+def get_connection() -> sqlite3.Connection:
     """
-    Fügt einen Eintrag in index.csv hinzu oder aktualisiert ihn.
-    Jahr wird immer automatisch aus Systemzeit ermittelt.
+    Eine SQLite-Verbindung pro Thread (Flask-Threads, Job-Worker, Watcher).
+    WAL erlaubt parallele Leser, während geschrieben wird.
+    Nach fork (Import-Prozesse) wird neu verbunden – Verbindungen dürfen nicht geerbt werden.
     """
-    fieldnames = ["Datei", "Jahr", "Institution", "Pfad"]
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.pid != os.getpid():
+        os.makedirs(os.path.dirname(INDEX_DB), exist_ok=True)
+        conn = sqlite3.connect(INDEX_DB, timeout=BUSY_TIMEOUT)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _local.conn = conn
+        _local.pid = os.getpid()
+        _ensure_schema(conn)
+    return conn
 
-    rows = []
-    if os.path.exists(INDEX_FILE):
-        with open(INDEX_FILE, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
 
-            # Prüfen ob Header korrekt ist, sonst Index zurücksetzen
-            if reader.fieldnames != fieldnames:
-                print("⚠️ Index-Datei beschädigt, wird neu erstellt...")
-                rows = []
-            else:
-                rows = list(reader)
+def _ensure_schema(conn: sqlite3.Connection):
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        # Ältere index.db ohne Hash-Spalte nachrüsten (vor dem Schema wegen des Index)
+        columns = {r["name"] for r in conn.execute("PRAGMA table_info(documents)")}
+        if columns and "sha256" not in columns:
+            conn.execute("ALTER TABLE documents ADD COLUMN sha256 TEXT")
+        conn.executescript(_SCHEMA)
+        _migrate_csv(conn)
+        _build_search_index(conn)
+        _initialized = True
 
-    filename = os.path.basename(filepath)
 
-    # 📅 Immer aktuelles Jahr verwenden
-    year = str(datetime.now().year)
+def _migrate_csv(conn: sqlite3.Connection):
+    """Übernimmt einmalig alle Zeilen der alten index.csv."""
+    done = conn.execute("SELECT value FROM meta WHERE key = 'csv_migrated'").fetchone()
+    if done or not os.path.exists(INDEX_FILE):
+        return
+
+    with open(INDEX_FILE, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames != FIELDNAMES:
+            log.warning("Alte index.csv hat ungültiges Format, Migration übersprungen")
+            rows = []
+        else:
+            rows = list(reader)
+
+    now = time.time()
+    with write_transaction(conn):
+        # Anderer Prozess hat zwischen Prüfung und Sperre migriert?
+        if conn.execute("SELECT value FROM meta WHERE key = 'csv_migrated'").fetchone():
+            return
+        conn.executemany(_UPSERT, [
+            (row["Pfad"], row["Datei"], row["Jahr"], row["Institution"] or "_Unklar", now, None)
+            for row in rows if row.get("Pfad")
+        ])
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_migrated', ?)",
+                     (datetime.now().isoformat(),))
+
+    try:
+        os.replace(INDEX_FILE, INDEX_FILE + ".migrated")
+    except OSError:
+        pass  # anderer Prozess war schneller
+    log.info("Einträge aus index.csv nach index.db übernommen", extra={"rows": len(rows)})
+
+
+def _sync_search(conn: sqlite3.Connection, paths: list):
+    """Überträgt die Einträge der Pfade in documents_search (innerhalb der Schreibtransaktion)."""
+    for path in paths:
+        record = conn.execute(
+            "SELECT rowid, filename, institution, year FROM documents WHERE path = ?", (path,)
+        ).fetchone()
+        if record is None:
+            continue
+        conn.execute("DELETE FROM documents_search WHERE rowid = ?", (record["rowid"],))
+        conn.execute(
+            "INSERT INTO documents_search (rowid, filename, institution, year) VALUES (?, ?, ?, ?)",
+            (record["rowid"], _fold(record["filename"]), _fold(record["institution"]), record["year"]),
+        )
+
+
+def _build_search_index(conn: sqlite3.Connection):
+    """Füllt documents_search einmalig für eine index.db, die älter ist als die Tabelle."""
+    if conn.execute("SELECT value FROM meta WHERE key = 'search_indexed'").fetchone():
+        return
+
+    with write_transaction(conn):
+        if conn.execute("SELECT value FROM meta WHERE key = 'search_indexed'").fetchone():
+            return
+        conn.execute("DELETE FROM documents_search")
+        records = conn.execute("SELECT rowid, filename, institution, year FROM documents").fetchall()
+        conn.executemany(
+            "INSERT INTO documents_search (rowid, filename, institution, year) VALUES (?, ?, ?, ?)",
+            [(r["rowid"], _fold(r["filename"]), _fold(r["institution"]), r["year"]) for r in records],
+        )
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('search_indexed', ?)",
+                     (datetime.now().isoformat(),))
+    if records:
+        log.info("Suchindex für Dateinamen/Institutionen aufgebaut", extra={"rows": len(records)})
+
+
+# ============================================================
+# 🔒 Schreibtransaktionen
+# ============================================================
+def _is_busy(error: sqlite3.OperationalError) -> bool:
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+def _begin_immediate(conn: sqlite3.Connection):
+    """
+    Schreibsperre gleich zu Beginn holen. Eine normale (DEFERRED) Transaktion, die erst
+    liest und dann schreibt, scheitert sonst sofort, wenn ein anderer Prozess dazwischen
+    geschrieben hat – ohne auf busy_timeout zu warten.
+    """
+    for attempt in range(WRITE_RETRIES + 1):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e) or attempt == WRITE_RETRIES:
+                raise
+            BUSY_RETRIES.inc()
+            time.sleep(min(0.05 * 2 ** attempt, 2.0) * (0.5 + random.random()))
+
+
+@contextmanager
+def write_transaction(conn: sqlite3.Connection = None):
+    """
+    Schreibtransaktion (BEGIN IMMEDIATE … COMMIT), bei Fehler ROLLBACK.
+
+        with write_transaction() as conn:
+            conn.execute(...)
+    """
+    conn = conn or get_connection()
+    _begin_immediate(conn)
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    COMMITS.inc()
+
+
+class _GroupWriter:
+    """
+    Ein Schreib-Thread je Prozess. Alle Aufträge, die eintreffen, während ein Commit läuft,
+    landen gemeinsam im nächsten: eine Sperre und ein Commit für viele Einträge statt
+    je Upload/Watcher-Datei einzeln um die Sperre zu konkurrieren.
+    Jeder Auftrag läuft in einem eigenen SAVEPOINT – ein Fehler betrifft nur ihn.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():  # nach fork neu starten
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._loop, name="index-writer", daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def submit(self, func):
+        if threading.current_thread() is self._thread:
+            return func(get_connection())  # Aufruf aus einem laufenden Auftrag
+        self._ensure_thread()
+        job = {"func": func, "done": threading.Event(), "result": None, "error": None}
+        self._queue.put(job)
+        job["done"].wait()
+        if job["error"] is not None:
+            raise job["error"]
+        return job["result"]
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < GROUP_COMMIT_MAX:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch: list):
+        try:
+            with write_transaction() as conn:
+                for job in batch:
+                    conn.execute("SAVEPOINT job")
+                    try:
+                        job["result"] = job["func"](conn)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO job")
+                        job["error"] = e
+                    conn.execute("RELEASE job")
+            BATCH_SIZE.observe(len(batch))
+        except Exception as e:
+            log.error("Gemeinsamer Commit fehlgeschlagen", extra={"jobs": len(batch), "error": str(e)})
+            for job in batch:
+                job["error"] = job["error"] or e
+        finally:
+            for job in batch:
+                job["done"].set()
+
+
+_writer = _GroupWriter()
+
+
+def submit_write(func):
+    """
+    Führt func(conn) in einer Schreibtransaktion aus und gibt das Ergebnis zurück.
+    Kehrt erst nach dem Commit zurück (anschließende Lesezugriffe sehen die Änderung).
+    func darf selbst weder committen noch `with conn:` verwenden und keinen Cursor
+    zurückgeben (er würde im aufrufenden Thread freigegeben, während der Schreib-Thread
+    die Verbindung nutzt).
+    """
+    if GROUP_COMMIT:
+        return _writer.submit(func)
+    with write_transaction() as conn:
+        return func(conn)
+
 
-    new_row = {
-        "Datei": filename,
-        "Jahr": year,
-        "Institution": institution if institution else "_Unklar",
-        "Pfad": filepath
+def _to_row(record: sqlite3.Row) -> dict:
+    return {
+        "Datei": record["filename"],
+        "Jahr": record["year"],
+        "Institution": record["institution"],
+        "Pfad": record["path"],
     }
 
-    # Alte Einträge mit gleichem Dateinamen + Pfad entfernen
-    rows = [row for row in rows if not (row.get("Datei") == filename and row.get("Pfad") == filepath)]
 
-    # Neuen Eintrag hinzufügen
-    rows.append(new_row)
+# ============================================================
+# ✍️ Schreiben
+# ============================================================
+def update_index_batch(entries: list):
+    """
+    Fügt mehrere Einträge in einer Transaktion hinzu oder aktualisiert sie.
+
+    Args:
+        entries (list[tuple]): (Dateipfad, Institution) oder (Dateipfad, Institution, Inhalts-Hash)
+    """
+    year = str(datetime.now().year)
+    now = time.time()
+    values = []
+    for entry in entries:
+        filepath, institution = entry[0], entry[1]
+        content_hash = entry[2] if len(entry) > 2 else None
+        values.append((filepath, os.path.basename(filepath), year,
+                       institution if institution else "_Unklar", now, content_hash))
+
+    def write(conn):
+        rows = conn.executemany(_UPSERT, values).rowcount
+        _sync_search(conn, [v[0] for v in values])
+        return rows
+
+    with timed("update_index"):
+        submit_write(write)
+    ROWS_WRITTEN.inc(len(values))
+    return values
+
+
+def update_index(filepath: str, institution: str, content_hash: str = None):
+    """
+    Fügt einen Eintrag in den Index hinzu oder aktualisiert ihn (Schlüssel = Pfad).
+    Jahr wird immer automatisch aus Systemzeit ermittelt.
+    """
+    path, filename, year, institution, _, _ = update_index_batch([(filepath, institution, content_hash)])[0]
+    log.info("Index aktualisiert", extra={"file": filename, "year": year, "institution": institution, "path": path})
+
 
-    # Datei neu schreiben
-    with open(INDEX_FILE, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+def remove_from_index(filepath: str):
+    """Entfernt den Eintrag einer gelöschten Datei (inkl. Suchindex)."""
+    def write(conn):
+        record = conn.execute("SELECT rowid FROM documents WHERE path = ?", (filepath,)).fetchone()
+        if record:
+            conn.execute("DELETE FROM documents_search WHERE rowid = ?", (record["rowid"],))
+            conn.execute("DELETE FROM documents WHERE rowid = ?", (record["rowid"],))
+        return bool(record)
 
-    print(f"📝 Index aktualisiert: {new_row}")
+    return submit_write(write)
 
 
+# ============================================================
+# 📖 Lesen
+# ============================================================
 def read_index():
     """
-    Liest alle Einträge aus index.csv.
+    Liest alle Einträge aus dem Index.
     Returns:
-        list[dict]: Liste aller Index-Einträge
+        list[dict]: Liste aller Index-Einträge (Schlüssel wie früher in index.csv)
     """
-    fieldnames = ["Datei", "Jahr", "Institution", "Pfad"]
+    records = get_connection().execute(
+        "SELECT path, filename, year, institution FROM documents ORDER BY rowid"
+    ).fetchall()
+    return [_to_row(r) for r in records]
+
 
-    if not os.path.exists(INDEX_FILE):
+def search_index(query: str, limit: int = -1, offset: int = 0):
+    """
+    Sucht (Groß-/Kleinschreibung egal) in Dateiname, Institution und Jahr.
+    Teilstrings ab SEARCH_MIN_CHARS Zeichen, über den Trigramm-Index statt Tabellen-Scan.
+    limit = -1 → alle Treffer.
+    Returns:
+        list[dict]: Treffer im Format von read_index()
+    """
+    query = _fold(query or "")
+    if not query:
         return []
+    if len(query) < SEARCH_MIN_CHARS:
+        return _search_short(query, limit, offset)
+    with timed("search_index"):
+        records = get_connection().execute(
+            """
+            SELECT d.path, d.filename, d.year, d.institution
+            FROM documents_search
+            JOIN documents d ON d.rowid = documents_search.rowid
+            WHERE documents_search MATCH :q
+            ORDER BY documents_search.rowid
+            LIMIT :limit OFFSET :offset
+            """,
+            {"q": '"' + query.replace('"', '""') + '"', "limit": limit, "offset": offset},
+        ).fetchall()
+    return [_to_row(r) for r in records]
 
-    with open(INDEX_FILE, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
 
-        # Prüfen ob Header korrekt ist
-        if reader.fieldnames != fieldnames:
-            print("⚠️ Ungültiges Index-Format, leere Liste zurückgegeben")
-            return []
+def _search_short(query: str, limit: int, offset: int) -> list:
+    """Ein bis zwei Zeichen: Institution gleich oder Dateiname beginnt damit (beides per Index)."""
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    with timed("search_index"):
+        records = get_connection().execute(
+            """
+            SELECT path, filename, year, institution FROM documents
+            WHERE institution = :q COLLATE NOCASE
+               OR filename LIKE :prefix ESCAPE '\\'
+            ORDER BY rowid
+            LIMIT :limit OFFSET :offset
+            """,
+            {"q": query, "prefix": escaped + "%", "limit": limit, "offset": offset},
+        ).fetchall()
+    return [_to_row(r) for r in records]
+
+
+def get_document(filepath: str):
+    """
+    Rohdaten eines Index-Eintrags (inkl. Inhalts-Hash und Aktualisierungszeit).
+    Returns:
+        dict | None: {"path", "filename", "year", "institution", "updated", "sha256"}
+    """
+    record = get_connection().execute(
+        "SELECT path, filename, year, institution, updated, sha256 FROM documents WHERE path = ?",
+        (filepath,),
+    ).fetchone()
+    return dict(record) if record else None
+
+
+def get_documents(filepaths: list) -> dict:
+    """
+    Index-Einträge mehrerer Dateien auf einmal (z. B. eine Seite von /list).
+    Returns:
+        dict: Pfad → {"path", "filename", "year", "institution", "updated", "sha256"}; fehlende Pfade fehlen
+    """
+    found = {}
+    conn = get_connection()
+    paths = list(filepaths)
+    for i in range(0, len(paths), 500):  # SQLite-Grenze für Platzhalter
+        chunk = paths[i:i + 500]
+        records = conn.execute(
+            f"SELECT path, filename, year, institution, updated, sha256 FROM documents "
+            f"WHERE path IN ({','.join('?' * len(chunk))})",
+            chunk,
+        ).fetchall()
+        found.update((r["path"], dict(r)) for r in records)
+    return found
+
+
+def count_documents() -> int:
+    """Anzahl der Einträge im Index (auch als Metrik autodoc_index_documents)."""
+    return get_connection().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+
+gauge("autodoc_index_documents", "Einträge in index.db", func=count_documents)
+
+
+@lru_cache(maxsize=4096)
+def _content_hash(filepath: str, mtime_ns: int, size: int) -> str:
+    entry = get_document(filepath)
+    if entry and entry["sha256"] and entry["updated"] * 1e9 >= mtime_ns:
+        return entry["sha256"]
+    return file_hash(filepath)
+
+
+def content_hash_for(filepath: str) -> str:
+    """
+    Inhalts-Hash einer archivierten Datei: aus dem Index, falls dieser nicht älter
+    als die Datei ist, sonst einmal berechnet (gemerkt je Pfad/mtime/Größe).
+    """
+    st = os.stat(filepath)
+    return _content_hash(filepath, st.st_mtime_ns, st.st_size)
+
+
+def find_by_hash(content_hash: str):
+    """
+    Sucht ein bereits archiviertes Dokument mit identischem Inhalt.
+    Einträge, deren Datei nicht mehr existiert, werden übersprungen.
+    Returns:
+        dict | None: Eintrag im Format von read_index()
+    """
+    records = get_connection().execute(
+        "SELECT path, filename, year, institution FROM documents WHERE sha256 = ? ORDER BY rowid",
+        (content_hash,),
+    ).fetchall()
+    for record in records:
+        if os.path.exists(record["path"]):
+            return _to_row(record)
+    return None
+
+
+# ============================================================
+# 🔁 Hashes für ältere Einträge nachtragen
+# ============================================================
+def backfill_hashes():
+    """Berechnet fehlende Inhalts-Hashes, damit auch alte Dokumente als Duplikat erkannt werden."""
+    conn = get_connection()
+    paths = [r["path"] for r in conn.execute("SELECT path FROM documents WHERE sha256 IS NULL")]
+    updated = 0
+    pending = []
+    for i, path in enumerate(paths, start=1):
+        if os.path.exists(path):
+            pending.append((file_hash(path), path))
+        # Hashen dauert, Sperre nur kurz und gebündelt halten
+        if pending and (len(pending) >= 100 or i == len(paths)):
+            with write_transaction(conn):
+                conn.executemany("UPDATE documents SET sha256 = ? WHERE path = ?", pending)
+            updated += len(pending)
+            pending = []
+    log.info("Hashes nachgetragen", extra={"updated": updated})
+
 
-        return list(reader)
+if __name__ == "__main__":
+    backfill_hashes()
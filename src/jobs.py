@@ -0,0 +1,125 @@
+# ==========================================================
+# 🧵 Hintergrund-Jobs für AutoDocOrganizer
+# /upload legt nur Jobs an, ein begrenzter Worker-Pool verarbeitet sie
+# ==========================================================
+
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import get_setting
+from metrics import STAGE_SECONDS, counter, gauge
+
+# 🔧 Größe des Worker-Pools und der Warteschlange (config/settings.yml → jobs)
+MAX_WORKERS = int(get_setting("jobs", "workers", 2))
+MAX_PENDING = int(get_setting("jobs", "max_pending", 500))
+KEEP_FINISHED = int(get_setting("jobs", "keep_finished", 1000))
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_ERROR = "error"
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ingest")
+_jobs = OrderedDict()
+_lock = threading.Lock()
+
+log = logging.getLogger(__name__)
+
+FINISHED = counter("autodoc_jobs_finished_total", "Abgeschlossene Upload-Jobs nach Status", ("status",))
+REJECTED = counter("autodoc_jobs_rejected_total", "Wegen voller Warteschlange abgelehnte Uploads")
+
+
+class QueueFullError(RuntimeError):
+    """Die Warteschlange ist voll – neue Jobs werden abgelehnt."""
+
+
+def _pending_count() -> int:
+    return sum(1 for job in _jobs.values() if job["status"] in (STATUS_QUEUED, STATUS_RUNNING))
+
+
+def _count_status(status: str) -> int:
+    with _lock:
+        return sum(1 for job in _jobs.values() if job["status"] == status)
+
+
+gauge("autodoc_jobs_queued", "Wartende Upload-Jobs", func=lambda: _count_status(STATUS_QUEUED))
+gauge("autodoc_jobs_running", "Laufende Upload-Jobs", func=lambda: _count_status(STATUS_RUNNING))
+
+
+def _prune():
+    """Entfernt die ältesten abgeschlossenen Jobs, damit der Speicher begrenzt bleibt."""
+    finished = [job_id for job_id, job in _jobs.items() if job["status"] in (STATUS_DONE, STATUS_ERROR)]
+    for job_id in finished[:max(0, len(finished) - KEEP_FINISHED)]:
+        del _jobs[job_id]
+
+
+def _run(job_id: str, func, args):
+    with _lock:
+        job = _jobs[job_id]
+        job["status"] = STATUS_RUNNING
+        job["started"] = time.time()
+    STAGE_SECONDS.observe(job["started"] - job["created"], stage="job_wait")
+
+    try:
+        result = func(*args)
+        update = {"status": STATUS_DONE, "result": result}
+    except Exception as e:
+        log.error("Job fehlgeschlagen", extra={"job": job_id, "file": job["filename"], "error": str(e)})
+        update = {"status": STATUS_ERROR, "error": str(e)}
+
+    with _lock:
+        job.update(update)
+        job["finished"] = time.time()
+    FINISHED.inc(status=update["status"])
+    STAGE_SECONDS.observe(job["finished"] - job["started"], stage="job_run")
+
+
+def submit(filename: str, func, *args, job_id: str = None) -> str:
+    """
+    Reiht einen Job ein und gibt sofort dessen ID zurück.
+
+    Args:
+        filename (str): Anzeigename für den Status (z. B. hochgeladener Dateiname)
+        func: Auszuführende Funktion, z. B. pipeline.process_document
+        *args: Argumente für func
+        job_id (str): feste ID (z. B. nach Neustart wieder eingereihter Upload), sonst neu erzeugt
+
+    Raises:
+        QueueFullError: wenn bereits MAX_PENDING Jobs warten oder laufen
+    """
+    job_id = job_id or uuid.uuid4().hex
+    with _lock:
+        if _pending_count() >= MAX_PENDING:
+            REJECTED.inc()
+            raise QueueFullError(f"Warteschlange voll ({MAX_PENDING} Jobs)")
+        _prune()
+        _jobs[job_id] = {
+            "id": job_id,
+            "filename": filename,
+            "status": STATUS_QUEUED,
+            "result": None,
+            "error": None,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+        }
+
+    _executor.submit(_run, job_id, func, args)
+    return job_id
+
+
+def get_job(job_id: str):
+    """Liefert eine Kopie des Job-Status oder None, falls unbekannt."""
+    with _lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def get_jobs(job_ids: list) -> list:
+    """Status mehrerer Jobs auf einmal (unbekannte IDs werden übersprungen)."""
+    with _lock:
+        return [dict(_jobs[job_id]) for job_id in job_ids if job_id in _jobs]
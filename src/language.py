@@ -0,0 +1,87 @@
+# ==========================================================
+# 🌐 Spracherkennung für die OCR
+# Aus einer ersten Textprobe (Textebene oder erste OCR-Seite) werden
+# die Tesseract-Sprachen für die restlichen Seiten bestimmt
+# Einstellungen: config/settings.yml → ocr
+# ==========================================================
+
+import re
+import threading
+
+from config import get_setting
+
+# 🔧 Kandidaten (Tesseract-Codes) und Erkennung
+OCR_LANG = str(get_setting("ocr", "lang", "deu+eng+ron"))       # alle erlaubten Sprachen
+AUTO_LANG = bool(get_setting("ocr", "auto_lang", True))          # False = immer OCR_LANG
+LANG_MIN_CHARS = int(get_setting("ocr", "lang_min_chars", 80))   # kürzere Proben sind zu unsicher
+LANG_MIN_PROB = float(get_setting("ocr", "lang_min_prob", 0.15))  # Anteil, ab dem eine Sprache mitläuft
+
+# ISO 639-1 (langdetect) → Tesseract-Traineddata
+ISO_TO_TESSERACT = {
+    "de": "deu", "en": "eng", "ro": "ron", "fr": "fra", "it": "ita", "es": "spa",
+    "pt": "por", "nl": "nld", "pl": "pol", "cs": "ces", "sk": "slk", "hu": "hun",
+    "hr": "hrv", "sl": "slv", "bg": "bul", "ru": "rus", "uk": "ukr", "el": "ell",
+    "tr": "tur", "ar": "ara", "da": "dan", "sv": "swe", "no": "nor", "fi": "fin",
+}
+
+LANG_RE = re.compile(r"[a-z]{3}(?:_[a-z]+)?(?:\+[a-z]{3}(?:_[a-z]+)?)*")
+
+_detect_lock = threading.Lock()
+_detect_langs = None
+
+
+def normalize_lang(value: str):
+    """
+    Prüft eine vorgegebene Sprachauswahl (z. B. aus /upload oder --lang).
+    Returns:
+        str | None: "deu+eng" o. ä.; None, wenn nichts vorgegeben
+    Raises:
+        ValueError: bei ungültigem Format
+    """
+    value = (value or "").strip().lower().replace(",", "+").replace(" ", "")
+    if not value or value == "auto":
+        return None
+    if not LANG_RE.fullmatch(value):
+        raise ValueError(f"Ungültige OCR-Sprache: {value!r} (erwartet z. B. 'deu' oder 'deu+eng')")
+    return value
+
+
+def candidates(lang: str = None) -> list:
+    return [code for code in (lang or OCR_LANG).split("+") if code]
+
+
+def _load_detector():
+    """langdetect erst bei der ersten Erkennung laden (Profile ≈ 100 ms), Ergebnis reproduzierbar."""
+    global _detect_langs
+    with _detect_lock:
+        if _detect_langs is None:
+            from langdetect import DetectorFactory, detect_langs
+            DetectorFactory.seed = 0
+            _detect_langs = detect_langs
+    return _detect_langs
+
+
+def detect_languages(text: str, allowed: str = None) -> str:
+    """
+    Erkennt die Sprachen einer Textprobe.
+    Returns:
+        str | None: Tesseract-Sprachen nach Häufigkeit, z. B. "deu" oder "deu+eng";
+                    None, wenn die Probe zu kurz oder nichts davon erlaubt ist
+    """
+    if not text or len(text.strip()) < LANG_MIN_CHARS:
+        return None
+    try:
+        from langdetect.lang_detect_exception import LangDetectException
+        found = _load_detector()(text)
+    except ImportError:
+        return None
+    except LangDetectException:
+        return None
+
+    allowed_codes = candidates(allowed)
+    chosen = []
+    for guess in found:
+        code = ISO_TO_TESSERACT.get(guess.lang)
+        if guess.prob >= LANG_MIN_PROB and code in allowed_codes and code not in chosen:
+            chosen.append(code)
+    return "+".join(chosen) or None
@@ -0,0 +1,116 @@
+# ==========================================================
+# 📂 Verzeichnis-Listen für /list
+# Ein os.scandir je Ordner (Typ, Größe, mtime ohne zusätzliche stat-Aufrufe),
+# Ergebnis im Speicher; gültig, solange sich die mtime des Ordners nicht ändert
+# (neue, gelöschte, umbenannte Dateien – auch durch Watcher oder Import)
+# Einstellungen: config/settings.yml → listing
+# ==========================================================
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from config import get_setting
+from metrics import CACHE_REQUESTS, timed
+
+PAGE_SIZE = int(get_setting("listing", "page_size", 200))
+MAX_PAGE_SIZE = int(get_setting("listing", "max_page_size", 1000))
+CACHE_DIRS = int(get_setting("listing", "cache_dirs", 256))   # so viele Ordner bleiben im Speicher
+
+SORT_KEYS = {
+    "name": lambda e: e["name"].casefold(),
+    "mtime": lambda e: e["mtime"],
+    "size": lambda e: e["size"],
+}
+
+# Änderungen innerhalb derselben Zeitstempel-Auflösung (FAT/SMB: bis 2 s) ändern die mtime
+# nicht sichtbar → Listen, die so kurz nach der letzten Änderung entstanden sind, nicht cachen
+RACY_SECONDS = 2.0
+
+_cache = OrderedDict()   # Ordnerpfad → {"mtime_ns", "entries", "sorted"}
+_lock = threading.Lock()
+
+
+def _scan(abs_path: str) -> list:
+    entries = []
+    with os.scandir(abs_path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+                st = entry.stat()
+            except OSError:
+                continue  # zwischen scandir und stat gelöscht
+            entries.append({
+                "name": entry.name,
+                "is_dir": is_dir,
+                "size": 0 if is_dir else st.st_size,
+                "mtime": int(st.st_mtime),
+            })
+    return entries
+
+
+def _cached_entries(abs_path: str) -> dict:
+    mtime_ns = os.stat(abs_path).st_mtime_ns
+    with _lock:
+        cached = _cache.get(abs_path)
+        if cached is not None and cached["mtime_ns"] == mtime_ns:
+            _cache.move_to_end(abs_path)
+            CACHE_REQUESTS.inc(cache="dir_list", result="hit")
+            return cached
+    CACHE_REQUESTS.inc(cache="dir_list", result="miss")
+
+    scanned_at = time.time()
+    with timed("list_dir"):
+        entries = _scan(abs_path)
+    cached = {"mtime_ns": mtime_ns, "entries": entries, "sorted": {}}
+    if scanned_at - mtime_ns / 1e9 >= RACY_SECONDS:
+        with _lock:
+            _cache[abs_path] = cached
+            _cache.move_to_end(abs_path)
+            while len(_cache) > CACHE_DIRS:
+                _cache.popitem(last=False)
+    return cached
+
+
+def _sorted(cached: dict, sort: str, descending: bool) -> list:
+    """Ordner immer zuerst; je Sortierung wird die Reihenfolge nur einmal berechnet."""
+    key = (sort, descending)
+    order = cached["sorted"].get(key)
+    if order is None:
+        entries = sorted(cached["entries"], key=SORT_KEYS[sort], reverse=descending)
+        order = [e for e in entries if e["is_dir"]] + [e for e in entries if not e["is_dir"]]
+        cached["sorted"][key] = order
+    return order
+
+
+def invalidate(abs_path: str = None):
+    """Ordner (und darunterliegende) verwerfen, z. B. nach Löschen; ohne Pfad alles."""
+    with _lock:
+        if abs_path is None:
+            _cache.clear()
+            return
+        prefix = abs_path.rstrip(os.sep) + os.sep
+        for path in [p for p in _cache if p == abs_path or p.startswith(prefix)]:
+            del _cache[path]
+
+
+def list_directory(abs_path: str, sort: str = "name", descending: bool = False,
+                   offset: int = 0, limit: int = PAGE_SIZE) -> dict:
+    """
+    Eine Seite eines Ordnerinhalts.
+
+    Raises:
+        ValueError: bei unbekannter Sortierung
+        OSError: wenn der Ordner nicht lesbar ist
+
+    Returns:
+        dict: {"items": [{"name", "is_dir", "size", "mtime"}, ...], "total": Anzahl Einträge}
+    """
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unbekannte Sortierung: {sort!r} (erlaubt: {', '.join(SORT_KEYS)})")
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    offset = max(offset, 0)
+
+    order = _sorted(_cached_entries(abs_path), sort, descending)
+    return {"items": [dict(e) for e in order[offset:offset + limit]], "total": len(order)}
@@ -0,0 +1,75 @@
+# ==========================================================
+# 📜 Strukturierte Logs für AutoDocOrganizer
+# Einheitliches Format für App, Watcher und Importer
+# Zusatzfelder: log.info("...", extra={"path": ..., "seconds": ...})
+# ==========================================================
+
+import json
+import logging
+import os
+import sys
+import time
+
+from config import get_setting
+
+# Attribute, die jeder LogRecord hat – alles andere sind Zusatzfelder aus extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_configured = False
+
+
+def _fields(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS and not k.startswith("_")}
+
+
+class JsonFormatter(logging.Formatter):
+    """Eine JSON-Zeile pro Ereignis (für Log-Sammler)."""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+                  + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(_fields(record))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Lesbare Konsolenzeile: Zeit, Level, Logger, Meldung, key=value."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s", "%H:%M:%S")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={json.dumps(v, ensure_ascii=False, default=str)}"
+                                   for k, v in fields.items())
+        return line
+
+
+def configure_logging():
+    """
+    Richtet das Root-Logging einmal pro Prozess ein (config/settings.yml → logging).
+    AUTODOC_LOG_FORMAT / AUTODOC_LOG_LEVEL überschreiben die Einstellungen.
+    """
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
+    level = os.getenv("AUTODOC_LOG_LEVEL", str(get_setting("logging", "level", "INFO"))).upper()
+    fmt = os.getenv("AUTODOC_LOG_FORMAT", str(get_setting("logging", "format", "text"))).lower()
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else KeyValueFormatter())
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(getattr(logging, level, logging.INFO))
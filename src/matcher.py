@@ -0,0 +1,102 @@
+# ==========================================================
+# 🔤 Aho-Corasick-Automat für die Institutionserkennung
+# Findet alle bekannten Namen in einem Durchlauf über den Text –
+# unabhängig davon, wie viele Institutionen schon bekannt sind
+# ==========================================================
+
+from collections import deque
+
+
+class InstitutionMatcher:
+    """
+    Mehrfach-Mustersuche (Teilstring, Kleinschreibung) mit Prioritäten.
+    Neue Namen landen zunächst in einer kleinen Nebenliste, die nach dem Automaten
+    geprüft wird; erst rebuild() (z. B. beim Speichern der Registry) oder mehr als
+    RECENT_MAX neue Namen übernehmen sie gebündelt in den Automaten.
+    """
+
+    RECENT_MAX = 64
+
+    def __init__(self):
+        self._goto = [{}]        # Zustand → {Zeichen: Folgezustand}
+        self._fail = [0]         # Zustand → Fehlerlink
+        self._out = [None]       # Zustand → (Priorität, Name) des besten endenden Musters
+        self._best = None        # wie _out, inkl. Treffer über Fehlerlinks
+        self._recent = {}        # Muster → (Priorität, Name), noch nicht im Automaten
+
+    def add(self, name: str, priority):
+        """Fügt einen Namen hinzu; kleinere Priorität gewinnt bei mehreren Treffern."""
+        pattern = name.lower()
+        if not pattern:
+            return
+        current = self._recent.get(pattern)
+        if current is None or priority < current[0]:
+            self._recent[pattern] = (priority, name)
+
+    def rebuild(self):
+        """Übernimmt die neuen Namen in den Trie und berechnet die Fehlerlinks neu."""
+        for pattern, entry in self._recent.items():
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(None)
+                state = nxt
+
+            current = self._out[state]
+            if current is None or entry[0] < current[0]:
+                self._out[state] = entry
+        self._recent = {}
+        self._build()
+
+    def _build(self):
+        """Berechnet Fehlerlinks per Breitensuche und vererbt die besten Treffer."""
+        self._fail = [0] * len(self._goto)
+        best = list(self._out)
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+
+                inherited = best[self._fail[nxt]]
+                if inherited and (best[nxt] is None or inherited[0] < best[nxt][0]):
+                    best[nxt] = inherited
+                queue.append(nxt)
+
+        self._best = best
+
+    def find_best(self, text_lower: str):
+        """
+        Liefert den Namen mit der kleinsten Priorität, der im Text vorkommt.
+        Returns:
+            str | None
+        """
+        if self._best is None or len(self._recent) > self.RECENT_MAX:
+            self.rebuild()
+
+        goto, fail, best = self._goto, self._fail, self._best
+        state = 0
+        found = None
+        for ch in text_lower:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            hit = best[state]
+            if hit and (found is None or hit[0] < found[0]):
+                found = hit
+
+        # Noch nicht übernommene Namen (höchstens RECENT_MAX) direkt prüfen
+        for pattern, entry in self._recent.items():
+            if (found is None or entry[0] < found[0]) and pattern in text_lower:
+                found = entry
+        return found[1] if found else None
@@ -0,0 +1,268 @@
+# ==========================================================
+# 📊 Laufzeit-Metriken für AutoDocOrganizer
+# Zähler, Latenz-Histogramme und Warteschlangen-Stände pro Prozess
+# Export im Prometheus-Textformat (→ /metrics in app.py)
+# ==========================================================
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from contextlib import contextmanager
+
+# Sekunden-Grenzen der Latenz-Histogramme (von SQLite-Upsert bis OCR eines langen PDFs)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _label_key(labelnames: tuple, labels: dict) -> tuple:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"Labels {sorted(labels)} passen nicht zu {list(labelnames)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    parts = []
+    for name, value in zip(labelnames, values):
+        escaped = value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{escaped}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monoton steigender Zähler, z. B. verarbeitete Seiten oder Cache-Treffer."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Gauge(_Metric):
+    """
+    Momentaufnahme, z. B. Länge einer Warteschlange.
+    Mit func wird der Wert erst beim Export abgefragt.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, func=None):
+        super().__init__(name, documentation)
+        self._value = 0
+        self._func = func
+
+    def set(self, value: float):
+        with self._lock:
+            self._value = value
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+    def value(self) -> float:
+        if self._func is not None:
+            return self._func()
+        with self._lock:
+            return self._value
+
+    def _samples(self):
+        try:
+            value = self.value()
+        except Exception:
+            return []
+        return [f"{self.name} {_format_value(value)}"]
+
+
+class Histogram(_Metric):
+    """Verteilung von Messwerten (Latenzen) in festen Buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._values = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["counts"][i] += 1
+                    break
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            entry = self._values.get(_label_key(self.labelnames, labels))
+            return entry["count"] if entry else 0
+
+    def _samples(self):
+        with self._lock:
+            items = sorted((key, dict(entry, counts=list(entry["counts"])))
+                           for key, entry in self._values.items())
+        lines = []
+        for key, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry["counts"]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(entry['sum'])}")
+            lines.append(f"{self.name}_count{labels} {entry['count']}")
+        return lines
+
+
+def _register(metric_cls, name, *args, **kwargs):
+    """Gleicher Name → gleiche Instanz (Module dürfen mehrfach registrieren)."""
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = metric_cls(name, *args, **kwargs)
+        elif not isinstance(metric, metric_cls):
+            raise ValueError(f"Metrik {name} existiert bereits als {metric.kind}")
+        return metric
+
+
+def counter(name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+    return _register(Counter, name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, func=None) -> Gauge:
+    metric = _register(Gauge, name, documentation)
+    if func is not None:
+        metric._func = func
+    return metric
+
+
+def histogram(name: str, documentation: str, labelnames: tuple = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram, name, documentation, labelnames, buckets)
+
+
+# ==========================================================
+# ⏱️ Gemeinsame Pipeline-Metriken
+# ==========================================================
+STAGE_SECONDS = histogram(
+    "autodoc_stage_duration_seconds",
+    "Dauer einzelner Verarbeitungsschritte in Sekunden",
+    ("stage",),
+)
+STAGE_ERRORS = counter(
+    "autodoc_stage_errors_total",
+    "Fehlgeschlagene Verarbeitungsschritte",
+    ("stage",),
+)
+CACHE_REQUESTS = counter(
+    "autodoc_cache_requests_total",
+    "Cache-Zugriffe nach Cache und Ergebnis (hit/miss)",
+    ("cache", "result"),
+)
+
+
+@contextmanager
+def timed(stage: str):
+    """
+    Misst die Dauer eines Schritts und zählt Ausnahmen (die weitergereicht werden).
+
+        with timed("move_to_archive"):
+            ...
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def render_prometheus() -> str:
+    """Alle registrierten Metriken im Prometheus-Textformat (Version 0.0.4)."""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # kein Zugriffslog pro Scrape
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Eigener /metrics-Endpunkt für Prozesse ohne Flask (Watcher, Massenimport).
+    Läuft in einem Daemon-Thread.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
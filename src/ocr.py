@@ -1,29 +1,639 @@
+import logging
+import math
+import multiprocessing
 import os
-import pytesseract
-from PIL import Image
-from pdf2image import convert_from_path
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
 
-POPPLER_PATH = r"C:\poppler\Library\bin"
-TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+from cache_store import DiskCache
+from config import get_setting
+from fileops import file_hash
+from language import AUTO_LANG, OCR_LANG, detect_languages
+from metrics import counter, gauge, timed
+from preprocess import MATCH_SCAN_DPI, choose_dpi, preprocess, scale_to_dpi, signature as preprocess_signature
 
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+# Über .env überschreibbar (z. B. für Benchmarks unter Linux/macOS)
+POPPLER_PATH = os.getenv("POPPLER_PATH", r"C:\poppler\Library\bin")
+TESSERACT_CMD = os.getenv("TESSERACT_CMD", r"C:\Program Files\Tesseract-OCR\tesseract.exe")
 
-def run_ocr(filepath: str) -> str:
-    text = ""
-    try:
-        if filepath.lower().endswith(".pdf"):
-            images = convert_from_path(filepath, poppler_path=POPPLER_PATH)
-            for img in images:
-                img = img.convert("L")  # grayscale
-                img = img.point(lambda x: 0 if x < 150 else 255, '1')  # binarizare pentru claritate
-                text += pytesseract.image_to_string(img, lang="deu+eng+ron") + "\n"
-        else:
-            img = Image.open(filepath).convert("L")
-            img = img.point(lambda x: 0 if x < 150 else 255, '1')
-            text = pytesseract.image_to_string(img, lang="deu+eng+ron")
+# 🔧 OCR-Parameter fließen in den Cache-Schlüssel ein
+# (Sprachen → language.py, Vorverarbeitung → preprocess.py)
+
+# 🔤 Tesseract-Anbindung: "tesserocr" hält pro Thread eine initialisierte Engine im Speicher
+# (Bild direkt aus dem Speicher, keine Temp-Datei, kein Prozessstart pro Seite),
+# "pytesseract" startet je Seite einen tesseract-Prozess; "auto" = tesserocr, falls installiert
+OCR_ENGINE = str(get_setting("ocr", "engine", "auto")).lower()
+TESSDATA_DIR = os.getenv("TESSDATA_PREFIX") or os.path.join(os.path.dirname(TESSERACT_CMD), "tessdata")
+# Je Engine (Sprachkombination) bleiben die LSTM-Modelle geladen → pro Thread nur so viele behalten
+ENGINES_PER_THREAD = max(1, int(get_setting("ocr", "engines_per_thread", 2)))
+
+# ⚡ Seitenparallele OCR (config/settings.yml → ocr)
+OCR_PARALLEL = bool(get_setting("ocr", "parallel", True))
+OCR_WORKERS = int(get_setting("ocr", "workers", 0)) or os.cpu_count() or 1
+PARALLEL_MIN_PAGES = int(get_setting("ocr", "parallel_min_pages", 3))
+PAGE_TIMEOUT = int(get_setting("ocr", "page_timeout", 120))  # Sekunden pro Seite, 0 = kein Limit
+
+# 🧮 Speichergrenze beim Rastern: Seiten werden fensterweise als Dateien erzeugt und
+# einzeln geladen; ein Fenster belegt höchstens RASTER_MAX_MB im Temp-Ordner
+RASTER_WINDOW = int(get_setting("ocr", "raster_window", 8))       # Seiten pro pdftoppm-Aufruf
+RASTER_MAX_MB = int(get_setting("ocr", "raster_max_mb", 256))
+
+# 📑 Textebene digital erzeugter PDFs direkt übernehmen (0 = immer OCR)
+TEXT_LAYER_MIN_CHARS = int(get_setting("ocr", "text_layer_min_chars", 25))
+
+# 🏷️ Briefkopf für die Klassifizierung: oberer Anteil von Seite 1 (1 = ganze Seite)
+HEADER_FRACTION = min(max(float(get_setting("ocr", "header_fraction", 0.3)), 0.05), 1.0)
+
+# 🖨️ Eingebettetes Bild gilt erst ab diesem Anteil der Seitenfläche als Scan (→ preprocess.match_scan_dpi)
+SCAN_MIN_COVERAGE = 0.5
+
+# Herkunft einer Seite im OCR-Ergebnis
+SOURCE_TEXT_LAYER = "text_layer"
+SOURCE_OCR = "ocr"
+
+# 🗄️ OCR-Ergebnisse nach Inhalts-Hash cachen → /translate & /explain ohne erneute OCR
+OCR_CACHE = DiskCache("ocr", max_bytes=int(get_setting("cache", "ocr_max_mb", 256)) * 1024 * 1024)
+
+_pool = None
+_pool_lock = threading.Lock()
+_libs = None
+_engines = threading.local()
+_tesserocr_failed = False
+
+log = logging.getLogger(__name__)
+
+# 📊 Seiten je Herkunft; Raster-/Tesseract-Zeiten zählen nur im jeweiligen Prozess
+PAGES = counter("autodoc_ocr_pages_total", "Verarbeitete Seiten nach Herkunft", ("source",))
+PAGES_IN_FLIGHT = gauge("autodoc_ocr_pool_pages_in_flight", "An den OCR-Prozess-Pool übergebene, offene Seiten")
+
+
+def load_ocr_libs():
+    """
+    pytesseract, Pillow, pdf2image und PyPDF2 erst bei der ersten OCR importieren,
+    damit App, Watcher und Worker schnell starten.
+    """
+    global _libs
+    if _libs is None:
+        import pytesseract
+        from PIL import Image
+        from PyPDF2 import PdfReader
+        from pdf2image import convert_from_path, pdfinfo_from_path
+        from pdf2image.exceptions import PDFPopplerTimeoutError
+
+        try:
+            import tesserocr
+        except ImportError:
+            tesserocr = None
+
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+        _libs = SimpleNamespace(
+            pytesseract=pytesseract,
+            tesserocr=tesserocr,
+            Image=Image,
+            PdfReader=PdfReader,
+            convert_from_path=convert_from_path,
+            pdfinfo_from_path=pdfinfo_from_path,
+            PDFPopplerTimeoutError=PDFPopplerTimeoutError,
+        )
+    return _libs
+
+
+def _cache_key(content_hash: str, lang: str = None) -> str:
+    lang_part = lang or (OCR_LANG + ("~auto" if AUTO_LANG else ""))
+    return f"{content_hash}|lang={lang_part}|{preprocess_signature()}|tl={TEXT_LAYER_MIN_CHARS}"
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Prozess-Pool wird beim ersten langen PDF erzeugt und danach wiederverwendet.
+    Immer spawn (wie unter Windows): fork aus der mehrfädigen App/dem Watcher könnte eine
+    gerade von einem anderen Thread gehaltene Sperre (Cache, Metriken) ins Kind kopieren.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# ============================================================
+# 🔤 Tesseract
+# ============================================================
+def engine_name() -> str:
+    """Tatsächlich verwendete Anbindung: "tesserocr" oder "pytesseract"."""
+    if OCR_ENGINE == "pytesseract" or _tesserocr_failed or load_ocr_libs().tesserocr is None:
+        return "pytesseract"
+    return "tesserocr"
+
+
+def _tesserocr_api(lang: str):
+    """
+    Engines je Thread, nach Sprache – Traineddata wird nur einmal geladen.
+    Höchstens ENGINES_PER_THREAD bleiben offen, die am längsten unbenutzte wird mit End() freigegeben.
+    """
+    apis = getattr(_engines, "apis", None)
+    if apis is None:
+        apis = _engines.apis = OrderedDict()
+    api = apis.get(lang)
+    if api is not None:
+        apis.move_to_end(lang)
+        return api
+
+    while len(apis) >= ENGINES_PER_THREAD:
+        _, old = apis.popitem(last=False)
+        old.End()
+    tesserocr = load_ocr_libs().tesserocr
+    kwargs = {"path": TESSDATA_DIR} if os.path.isdir(TESSDATA_DIR) else {}
+    with timed("tesseract_init"):
+        api = apis[lang] = tesserocr.PyTessBaseAPI(lang=lang, **kwargs)
+    return api
+
+
+def _tesserocr_to_string(img, lang: str, dpi: int) -> str:
+    api = _tesserocr_api(lang)
+    try:
+        api.SetImage(img)
+        if dpi:
+            api.SetSourceResolution(dpi)
+        # Recognize(timeout) in ms; False = abgebrochen → wie pytesseract als RuntimeError melden
+        if not api.Recognize(PAGE_TIMEOUT * 1000):
+            raise RuntimeError(f"Tesseract-Zeitüberschreitung nach {PAGE_TIMEOUT} s")
+        return api.GetUTF8Text()
+    finally:
+        api.Clear()
+
+
+def _image_to_string(img, lang: str = OCR_LANG, dpi: int = 0) -> str:
+    global _tesserocr_failed
+    if engine_name() == "tesserocr":
+        try:
+            return _tesserocr_to_string(img, lang, dpi)
+        except RuntimeError as e:
+            # Initialisierung fehlgeschlagen (z. B. Traineddata nicht gefunden) → dauerhaft pytesseract
+            if getattr(_engines, "apis", {}).get(lang) is not None:
+                raise
+            log.warning("tesserocr nicht nutzbar, weiter mit pytesseract", extra={"error": str(e)})
+            _tesserocr_failed = True
+
+    config = f"--dpi {dpi}" if dpi else ""
+    return load_ocr_libs().pytesseract.image_to_string(img, lang=lang, config=config, timeout=PAGE_TIMEOUT)
+
+
+# ============================================================
+# 🖼️ Einzelseiten
+# ============================================================
+def _ocr_image(img, dpi: int = 0, lang: str = OCR_LANG) -> str:
+    """dpi = Rasterauflösung; Tesseract schätzt sie sonst (und warnt bei 0 dpi)."""
+    img = preprocess(img)
+    with timed("tesseract"):
+        return _image_to_string(img, lang, dpi)
+
+
+def _ocr_image_file(filepath: str, content_hash: str = None, lang: str = OCR_LANG) -> str:
+    img = load_ocr_libs().Image.open(filepath)
+    _keep_thumbnail(content_hash, 1, img)
+    dpi = img.info.get("dpi")
+    img, dpi = scale_to_dpi(img, float(dpi[0]) if dpi else 0)
+    return _ocr_image(img, dpi, lang)
+
+
+def _keep_thumbnail(content_hash: str, page_no: int, img):
+    """Nebenbei: Vorschaubild aus der ohnehin gerasterten Seite speichern."""
+    if not content_hash:
+        return
+    try:
+        from thumbnails import store_page_thumbnail
+        store_page_thumbnail(content_hash, page_no, img)
     except Exception as e:
-        print(f"❌ Fehler bei OCR ({filepath}): {e}")
+        log.warning("Vorschaubild fehlgeschlagen", extra={"page": page_no, "error": str(e)})
+
+
+def _ocr_pdf_page(filepath: str, page_no: int, content_hash: str = None, dpi: int = 0,
+                  lang: str = OCR_LANG) -> str:
+    """
+    Rastert genau eine PDF-Seite und erkennt den Text.
+    Läuft im Worker-Prozess; bei Timeout bleibt die Seite leer.
+    """
+    libs = load_ocr_libs()
+    dpi = dpi or choose_dpi()
+    try:
+        with timed("rasterize"):
+            images = libs.convert_from_path(filepath, poppler_path=POPPLER_PATH, dpi=dpi,
+                                            first_page=page_no, last_page=page_no,
+                                            timeout=PAGE_TIMEOUT or None)
+        if not images:
+            return ""
+        _keep_thumbnail(content_hash, page_no, images[0])
+        return _ocr_image(images[0], dpi, lang)
+    except (RuntimeError, libs.PDFPopplerTimeoutError) as e:
+        # pytesseract meldet Zeitüberschreitungen als RuntimeError
+        log.warning("Seite übersprungen (Zeitüberschreitung)",
+                    extra={"path": filepath, "page": page_no, "error": str(e)})
         return ""
 
-    return text.strip()
 
+# ============================================================
+# 📑 Textebene (digital erzeugte PDFs)
+# ============================================================
+def _usable_text_layer(text: str) -> bool:
+    """Textebene gilt als brauchbar, wenn genug Buchstaben/Ziffern vorhanden sind."""
+    if not text or TEXT_LAYER_MIN_CHARS <= 0:
+        return False
+    compact = "".join(text.split())
+    if len(compact) < TEXT_LAYER_MIN_CHARS:
+        return False
+    alnum = sum(ch.isalnum() for ch in compact)
+    return alnum / len(compact) >= 0.5
+
+
+def _read_page(page) -> tuple:
+    """
+    Textebene und platzierte Bildgrößen einer Seite in einem Durchlauf durch den Inhaltsstrom.
+    Returns:
+        (str, dict): Text ("" ohne Textebene bzw. wenn nicht benötigt), Bildname → (Breite, Höhe) in pt
+    """
+    placed = {}
+
+    def visit(operator, operands, cm, tm):
+        if operator == b"Do" and operands:
+            placed[operands[0]] = (math.hypot(cm[0], cm[1]), math.hypot(cm[2], cm[3]))
+
+    if TEXT_LAYER_MIN_CHARS <= 0 and not MATCH_SCAN_DPI:
+        return "", placed
+    text = page.extract_text(visitor_operand_before=visit if MATCH_SCAN_DPI else None) or ""
+    return (text if TEXT_LAYER_MIN_CHARS > 0 else ""), placed
+
+
+def _page_geometry(pages, placements: list) -> tuple:
+    """
+    Größte Seite (in pt) und Auflösung eingebetteter Scan-Bilder (dpi, 0 = keine).
+    Nur Bilder, die mindestens SCAN_MIN_COVERAGE der Seite bedecken, zählen als Scan
+    (Logos, Stempel, Unterschriften verfälschen die Auflösung sonst).
+    Liest nur die Bild-Metadaten, dekodiert nichts.
+    """
+    width = height = scan_dpi = 0.0
+    for page, placed in zip(pages, placements):
+        page_w, page_h = float(page.mediabox.width), float(page.mediabox.height)
+        if page_w * page_h > width * height:
+            width, height = page_w, page_h
+        if not placed:
+            continue
+        try:
+            xobjects = page["/Resources"].get_object().get("/XObject")
+            items = list(xobjects.get_object().items()) if xobjects else []
+        except (KeyError, AttributeError, TypeError):
+            continue
+        for name, obj in items:
+            image = obj.get_object()
+            if image.get("/Subtype") != "/Image" or name not in placed:
+                continue
+            shown_w, shown_h = placed[name]
+            if shown_w * shown_h < SCAN_MIN_COVERAGE * page_w * page_h:
+                continue
+            pixels = max(int(image.get("/Width", 0)), int(image.get("/Height", 0)))
+            scan_dpi = max(scan_dpi, pixels / (max(shown_w, shown_h) / 72))
+    return width, height, scan_dpi
+
+
+def _read_pdf(filepath: str) -> tuple:
+    """
+    Liest mit PyPDF2 die eingebettete Textebene jeder Seite und wählt die Raster-DPI.
+    Returns:
+        (list[str], int, tuple): Text pro Seite ("" = keine Textebene; leere Liste, wenn PDF unlesbar),
+                                 DPI für die OCR-Seiten und größtes Seitenformat in pt
+    """
+    try:
+        with timed("text_layer"):
+            reader = load_ocr_libs().PdfReader(filepath)
+            if reader.is_encrypted:
+                reader.decrypt("")
+            texts, placements = zip(*(_read_page(page) for page in reader.pages)) if reader.pages else ((), ())
+            texts = list(texts)
+            width, height, scan_dpi = _page_geometry(reader.pages, placements)
+        return texts, choose_dpi(width, height, scan_dpi), (width, height)
+    except Exception as e:
+        log.warning("PDF-Struktur nicht lesbar, OCR für alle Seiten", extra={"path": filepath, "error": str(e)})
+        return [], choose_dpi(), (0, 0)
+
+
+# ============================================================
+# 📄 Ganze Dokumente
+# ============================================================
+def _window_size(dpi: int, page_size: tuple = None) -> int:
+    """Seiten pro Fenster, sodass die gerasterten Dateien RASTER_MAX_MB nicht überschreiten."""
+    width, height = page_size if page_size and page_size[0] else (595, 842)  # unbekannt → A4
+    page_mb = (width / 72 * dpi) * (height / 72 * dpi) * 3 / (1024 * 1024)  # RGB-PPM
+    return max(1, min(RASTER_WINDOW, int(RASTER_MAX_MB // page_mb)))
+
+
+def _page_windows(page_numbers: list, size: int) -> list:
+    """Zusammenhängende Seitenbereiche mit höchstens size Seiten: [(first, last), ...]"""
+    windows = []
+    for n in sorted(page_numbers):
+        if windows and n == windows[-1][1] + 1 and n - windows[-1][0] < size:
+            windows[-1][1] = n
+        else:
+            windows.append([n, n])
+    return [tuple(w) for w in windows]
+
+
+def _ocr_pdf_window(filepath: str, first: int, last: int, content_hash: str, dpi: int,
+                    lang: str = OCR_LANG) -> dict:
+    """
+    Rastert einen Seitenbereich als Dateien in einen Temp-Ordner (paths_only)
+    und lädt jeweils nur eine Seite in den Speicher; jede Datei wird sofort gelöscht.
+    """
+    libs = load_ocr_libs()
+    texts = {}
+    with tempfile.TemporaryDirectory(prefix="autodoc-raster-") as tmp_dir:
+        try:
+            with timed("rasterize"):
+                paths = libs.convert_from_path(filepath, poppler_path=POPPLER_PATH, dpi=dpi,
+                                               first_page=first, last_page=last,
+                                               output_folder=tmp_dir, paths_only=True,
+                                               timeout=(PAGE_TIMEOUT * (last - first + 1)) or None)
+        except libs.PDFPopplerTimeoutError:
+            # Einzeln nachholen: dort wird nur die hängende Seite übersprungen
+            return {n: _ocr_pdf_page(filepath, n, content_hash, dpi, lang) for n in range(first, last + 1)}
+
+        for page_no, path in enumerate(sorted(paths), start=first):
+            with libs.Image.open(path) as img:
+                img.load()
+                _keep_thumbnail(content_hash, page_no, img)
+                try:
+                    texts[page_no] = _ocr_image(img, dpi, lang)
+                except RuntimeError as e:
+                    log.warning("Seite übersprungen (Zeitüberschreitung)",
+                                extra={"path": filepath, "page": page_no, "error": str(e)})
+                    texts[page_no] = ""
+            os.remove(path)
+    return texts
+
+
+def _ocr_pdf_serial(filepath: str, page_numbers: list, content_hash: str = None,
+                    dpi: int = 0, page_size: tuple = None, lang: str = OCR_LANG) -> dict:
+    """
+    Seiten fensterweise rastern und erkennen – der Speicherbedarf hängt
+    nicht von der Seitenzahl ab (siehe RASTER_WINDOW / RASTER_MAX_MB).
+    """
+    dpi = dpi or choose_dpi()
+    texts = {}
+    for first, last in _page_windows(page_numbers, _window_size(dpi, page_size)):
+        texts.update(_ocr_pdf_window(filepath, first, last, content_hash, dpi, lang))
+    return texts
+
+
+def _ocr_pdf_parallel(filepath: str, page_numbers: list, content_hash: str = None,
+                      dpi: int = 0, page_size: tuple = None, lang: str = OCR_LANG) -> dict:
+    """
+    Verteilt die Seiten auf den Prozess-Pool. Reihenfolge bleibt erhalten;
+    fällt der Pool aus, werden die fehlenden Seiten seriell nachgeholt.
+    """
+    try:
+        pool = _get_pool()
+        futures = {}
+        for n in page_numbers:
+            futures[n] = pool.submit(_ocr_pdf_page, filepath, n, content_hash, dpi, lang)
+            PAGES_IN_FLIGHT.inc()
+            futures[n].add_done_callback(lambda _: PAGES_IN_FLIGHT.dec())
+    except (BrokenProcessPool, OSError, RuntimeError) as e:
+        log.warning("OCR-Pool nicht verfügbar, serielle Verarbeitung", extra={"error": str(e)})
+        _reset_pool()
+        return _ocr_pdf_serial(filepath, page_numbers, content_hash, dpi, page_size, lang)
+
+    # Frist für das ganze Dokument: je Runde (OCR_WORKERS Seiten) Rastern + Erkennen
+    deadline = None
+    if PAGE_TIMEOUT:
+        rounds = -(-len(page_numbers) // OCR_WORKERS)
+        deadline = time.monotonic() + 2 * PAGE_TIMEOUT * rounds + 30
+
+    texts = {}
+    for page_no, future in futures.items():
+        try:
+            timeout = max(0.0, deadline - time.monotonic()) if deadline else None
+            texts[page_no] = future.result(timeout=timeout)
+        except BrokenProcessPool as e:
+            log.warning("OCR-Worker abgestürzt, seriell weiter", extra={"page": page_no, "error": str(e)})
+            _reset_pool()
+            texts[page_no] = _ocr_pdf_page(filepath, page_no, content_hash, dpi, lang)
+        except CancelledError:
+            # Pool wurde wegen einer hängenden Seite verworfen, bevor diese Seite drankam
+            texts[page_no] = _ocr_pdf_page(filepath, page_no, content_hash, dpi, lang)
+        except FuturesTimeoutError:
+            # Worker hängt → Seite wie bei jeder Zeitüberschreitung überspringen, neuer Pool für die nächsten
+            log.warning("Seite übersprungen (Zeitüberschreitung im OCR-Pool)",
+                        extra={"path": filepath, "page": page_no})
+            future.cancel()
+            _reset_pool()
+            texts[page_no] = ""
+    return texts
+
+
+def _ocr_pdf(filepath: str, content_hash: str = None, lang: str = None) -> tuple:
+    """
+    Seiten mit brauchbarer Textebene werden direkt übernommen,
+    nur reine Bildseiten werden gerastert und per Tesseract erkannt.
+    Ohne vorgegebene Sprache bestimmt eine Probe (Textebene, sonst erste Bildseite
+    mit allen Kandidaten) die Sprachen für die übrigen Seiten.
+    Returns:
+        (list[dict], str, str): Seiten, Dokumentsprachen, Herkunft ("override" | "detected" | "default")
+    """
+    layer, dpi, page_size = _read_pdf(filepath)
+    page_count = len(layer)
+    if not page_count:
+        page_count = load_ocr_libs().pdfinfo_from_path(filepath, poppler_path=POPPLER_PATH).get("Pages", 0)
+
+    pages = []
+    ocr_pages = []
+    for n in range(1, page_count + 1):
+        text = layer[n - 1] if n <= len(layer) else ""
+        if _usable_text_layer(text):
+            pages.append({"page": n, "source": SOURCE_TEXT_LAYER, "lang": None, "text": text})
+        else:
+            pages.append({"page": n, "source": SOURCE_OCR, "lang": None, "text": ""})
+            ocr_pages.append(n)
+
+    lang_source = "override" if lang else "default"
+    remaining = ocr_pages
+    if not lang and AUTO_LANG:
+        with timed("detect_language"):
+            lang = detect_languages("\n".join(p["text"] for p in pages if p["source"] == SOURCE_TEXT_LAYER))
+        if not lang and ocr_pages:
+            probe, remaining = ocr_pages[0], ocr_pages[1:]
+            pages[probe - 1]["text"] = _ocr_pdf_serial(filepath, [probe], content_hash, dpi, page_size).get(probe, "")
+            pages[probe - 1]["lang"] = OCR_LANG
+            with timed("detect_language"):
+                lang = detect_languages(pages[probe - 1]["text"])
+        if lang:
+            lang_source = "detected"
+    lang = lang or OCR_LANG
+
+    if remaining:
+        if OCR_PARALLEL and OCR_WORKERS > 1 and len(remaining) >= max(PARALLEL_MIN_PAGES, 2):
+            texts = _ocr_pdf_parallel(filepath, remaining, content_hash, dpi, page_size, lang)
+        else:
+            texts = _ocr_pdf_serial(filepath, remaining, content_hash, dpi, page_size, lang)
+        for n in remaining:
+            pages[n - 1]["text"] = texts.get(n, "")
+            pages[n - 1]["lang"] = lang
+
+    text_layer_hits = page_count - len(ocr_pages)
+    PAGES.inc(text_layer_hits, source=SOURCE_TEXT_LAYER)
+    PAGES.inc(len(ocr_pages), source=SOURCE_OCR)
+    log.info("PDF erkannt", extra={"file": os.path.basename(filepath), "pages": page_count,
+                                   "text_layer_pages": text_layer_hits, "ocr_pages": len(ocr_pages),
+                                   "dpi": dpi if ocr_pages else None, "lang": lang, "lang_source": lang_source})
+    return pages, lang, lang_source
+
+
+def _ocr_file(filepath: str, content_hash: str = None, lang: str = None) -> dict:
+    if filepath.lower().endswith(".pdf"):
+        pages, lang, lang_source = _ocr_pdf(filepath, content_hash, lang)
+    else:
+        # Einzelbild: eine Seite → Erkennung nur zur Dokumentation, kein zweiter Durchlauf
+        used = lang or OCR_LANG
+        text = _ocr_image_file(filepath, content_hash, used)
+        pages = [{"page": 1, "source": SOURCE_OCR, "lang": used, "text": text}]
+        PAGES.inc(source=SOURCE_OCR)
+        lang_source = "override" if lang else "default"
+        detected = None if lang or not AUTO_LANG else detect_languages(text)
+        if detected:
+            lang, lang_source = detected, "detected"
+        lang = lang or OCR_LANG
+
+    return {
+        "text": "\n".join(p["text"] for p in pages).strip(),
+        "lang": lang,
+        "lang_source": lang_source,
+        "pages": [{"page": p["page"], "source": p["source"], "lang": p["lang"]} for p in pages],
+    }
+
+
+def ocr_document(filepath: str, content_hash: str = None, lang: str = None) -> dict:
+    """
+    OCR mit Details pro Seite (Cache-gestützt).
+    content_hash kann mitgegeben werden, wenn der Aufrufer ihn schon kennt.
+    lang (z. B. "deu" oder "deu+ron") überschreibt die automatische Spracherkennung.
+    Returns:
+        dict: {"text": str, "lang": erkannte/vorgegebene Sprachen,
+               "lang_source": "override" | "detected" | "default",
+               "pages": [{"page": 1, "source": "text_layer" | "ocr", "lang": Tesseract-Sprachen | None}, ...]}
+              bei Fehlern ein Ergebnis mit leerem Text
+    """
+    try:
+        content_hash = content_hash or file_hash(filepath)
+        key = _cache_key(content_hash, lang)
+        cached = OCR_CACHE.get_json(key)
+        if cached is not None:
+            return cached
+
+        with timed("ocr"):
+            result = _ocr_file(filepath, content_hash, lang)
+    except Exception as e:
+        log.error("Fehler bei OCR", extra={"path": filepath, "error": str(e)})
+        return {"text": "", "lang": lang or OCR_LANG, "lang_source": "override" if lang else "default", "pages": []}
+
+    try:
+        OCR_CACHE.set_json(key, result)
+    except OSError as e:
+        log.warning("OCR-Cache nicht schreibbar", extra={"error": str(e)})
+    return result
+
+
+# ============================================================
+# 🏷️ Nur der Briefkopf (Klassifizierung vor der vollständigen OCR)
+# ============================================================
+def _crop_header(img):
+    if HEADER_FRACTION >= 1:
+        return img
+    return img.crop((0, 0, img.width, max(1, int(img.height * HEADER_FRACTION))))
+
+
+def _ocr_pdf_header(filepath: str, content_hash: str = None, lang: str = OCR_LANG) -> tuple:
+    """Textebene von Seite 1, sonst nur Seite 1 rastern und deren oberen Teil erkennen."""
+    libs = load_ocr_libs()
+    page_size, scan_dpi = (0, 0), 0
+    try:
+        with timed("text_layer"):
+            reader = libs.PdfReader(filepath)
+            if reader.is_encrypted:
+                reader.decrypt("")
+            first = reader.pages[0]
+            text, placed = _read_page(first)
+            width, height, scan_dpi = _page_geometry([first], [placed])
+            page_size = (width, height)
+        if _usable_text_layer(text):
+            PAGES.inc(source=SOURCE_TEXT_LAYER)
+            return text, SOURCE_TEXT_LAYER
+    except Exception as e:
+        log.warning("PDF-Struktur nicht lesbar, Briefkopf per OCR", extra={"path": filepath, "error": str(e)})
+
+    dpi = choose_dpi(*page_size, scan_dpi)
+    with timed("rasterize"):
+        images = libs.convert_from_path(filepath, poppler_path=POPPLER_PATH, dpi=dpi,
+                                        first_page=1, last_page=1, timeout=PAGE_TIMEOUT or None)
+    if not images:
+        return "", SOURCE_OCR
+    _keep_thumbnail(content_hash, 1, images[0])
+    PAGES.inc(source=SOURCE_OCR)
+    return _ocr_image(_crop_header(images[0]), dpi, lang), SOURCE_OCR
+
+
+def _ocr_image_header(filepath: str, content_hash: str = None, lang: str = OCR_LANG) -> tuple:
+    img = load_ocr_libs().Image.open(filepath)
+    _keep_thumbnail(content_hash, 1, img)
+    dpi = img.info.get("dpi")
+    img, dpi = scale_to_dpi(img, float(dpi[0]) if dpi else 0)
+    PAGES.inc(source=SOURCE_OCR)
+    return _ocr_image(_crop_header(img), dpi, lang), SOURCE_OCR
+
+
+def ocr_header(filepath: str, content_hash: str = None, lang: str = None) -> dict:
+    """
+    Erkennt nur den Briefkopf (oberer Teil von Seite 1) – reicht für die Institution,
+    kostet bei langen PDFs aber nur einen Bruchteil der vollständigen OCR.
+    Ohne vorgegebene Sprache laufen alle Kandidaten (OCR_LANG) mit.
+    Returns:
+        dict: {"text": str, "lang": Tesseract-Sprachen, "source": "text_layer" | "ocr"}
+              bei Fehlern ein Ergebnis mit leerem Text
+    """
+    used = lang or OCR_LANG
+    try:
+        content_hash = content_hash or file_hash(filepath)
+        key = f"{_cache_key(content_hash, used)}|header={HEADER_FRACTION:g}"
+        cached = OCR_CACHE.get_json(key)
+        if cached is not None:
+            return cached
+
+        with timed("ocr_header"):
+            if filepath.lower().endswith(".pdf"):
+                text, source = _ocr_pdf_header(filepath, content_hash, used)
+            else:
+                text, source = _ocr_image_header(filepath, content_hash, used)
+    except Exception as e:
+        log.error("Fehler bei OCR (Briefkopf)", extra={"path": filepath, "error": str(e)})
+        return {"text": "", "lang": used, "source": SOURCE_OCR}
+
+    result = {"text": text.strip(), "lang": used, "source": source}
+    try:
+        OCR_CACHE.set_json(key, result)
+    except OSError as e:
+        log.warning("OCR-Cache nicht schreibbar", extra={"error": str(e)})
+    return result
+
+
+def run_ocr(filepath: str) -> str:
+    return ocr_document(filepath)["text"]
@@ -0,0 +1,213 @@
+# ==========================================================
+# 🔄 Verarbeitungs-Pipeline für AutoDocOrganizer
+# OCR → Institution erkennen → Archivieren → Index aktualisieren
+# Zweistufig (pipeline.header_first): erst nur der Briefkopf → sofort ablegen,
+# die vollständige OCR folgt im Hintergrund oder bei der ersten Anfrage
+# ==========================================================
+
+import itertools
+import logging
+import os
+import queue
+import threading
+
+from config import get_setting
+from ocr import ocr_document, ocr_header, run_ocr
+from extract_institution import extract_institution
+from fileops import move_to_archive, file_hash
+from indexer import update_index, find_by_hash
+from fulltext import get_pending, get_text, index_document, pending_documents, remove_document
+from metrics import counter, timed
+
+log = logging.getLogger(__name__)
+
+# 🔧 config/settings.yml → pipeline
+HEADER_FIRST = bool(get_setting("pipeline", "header_first", True))
+COMPLETE_WORKERS = max(1, int(get_setting("pipeline", "complete_workers", 1)))
+# False = vorgemerkte Dokumente nicht in diesem Prozess nachholen (Import-Worker: erledigt bulk_import)
+COMPLETE_IN_BACKGROUND = True
+
+# Reihenfolge der Nachhol-Warteschlange: angefragte Dokumente (Suche) vor dem Rest
+PRIORITY_DEMAND = 0
+PRIORITY_BACKGROUND = 1
+
+DOCUMENTS = counter("autodoc_documents_total", "Durch die Pipeline gelaufene Dokumente", ("result",))
+COMPLETED = counter("autodoc_deferred_ocr_total", "Nachgeholte vollständige OCR nach Ergebnis", ("result",))
+
+_queue = queue.PriorityQueue()
+_queued = {}                 # Pfad → Priorität (Duplikate in der Warteschlange vermeiden)
+_queue_lock = threading.Lock()
+_order = itertools.count()
+_workers = []
+_path_locks = {}
+
+
+def process_document(filepath: str, ocr_lang: str = None) -> dict:
+    """
+    Schickt eine Datei durch den kompletten Ablage-Workflow.
+
+    Args:
+        filepath (str): Pfad zur eingegangenen Datei (wird verschoben)
+        ocr_lang (str): Tesseract-Sprachen für dieses Dokument (None = automatisch)
+
+    Returns:
+        dict: {"path": Zielpfad im Archiv, "institution": erkannte Institution,
+               "pages": Seitenzahl (0, solange die vollständige OCR aussteht –
+                        complete_document liefert sie nach),
+               "duplicate": True, falls schon archiviert,
+               "deferred": True, falls bisher nur der Briefkopf erkannt ist}
+    """
+    with timed("pipeline"):
+        result = _process_document(filepath, ocr_lang)
+    if result["duplicate"]:
+        DOCUMENTS.inc(result="duplicate")
+    else:
+        DOCUMENTS.inc(result="deferred" if result["deferred"] else "archived")
+    return result
+
+
+def _process_document(filepath: str, ocr_lang: str = None) -> dict:
+    # ♻️ Identischer Inhalt schon im Archiv? → nichts erneut erkennen/ablegen
+    content_hash = file_hash(filepath)
+    existing = find_by_hash(content_hash)
+    if existing and os.path.exists(existing["Pfad"]):
+        os.remove(filepath)
+        log.info("Duplikat – nicht erneut archiviert", extra={"duplicate_of": existing["Pfad"]})
+        return {"path": existing["Pfad"], "institution": existing["Institution"],
+                "pages": 0, "duplicate": True, "deferred": False}
+
+    # 🏷️ Zuerst nur der Briefkopf – die Institution steht fast immer dort
+    institution = None
+    if HEADER_FIRST:
+        header = ocr_header(filepath, content_hash=content_hash, lang=ocr_lang)
+        institution = extract_institution(header["text"])
+        if institution == "_Unklar":
+            institution = None  # nicht gefunden → doch die vollständige OCR abwarten
+
+    if institution:
+        final_path = move_to_archive(filepath, institution)
+        update_index(final_path, institution, content_hash)
+
+        # 🔎 Vorerst nur den Briefkopf durchsuchbar machen, Rest nachholen
+        with timed("fulltext_index"):
+            index_document(final_path, header["text"], partial=True,
+                           content_hash=content_hash, ocr_lang=ocr_lang)
+        schedule_completion(final_path)
+        return {"path": final_path, "institution": institution, "pages": 0,
+                "duplicate": False, "deferred": True}
+
+    # 📝 OCR → Text extrahieren
+    ocr = ocr_document(filepath, content_hash=content_hash, lang=ocr_lang)
+    text = ocr["text"]
+
+    # 🏢 Institution erkennen (Fallback = _Unklar)
+    institution = extract_institution(text) or "_Unklar"
+
+    # 📦 Datei direkt ins Archiv verschieben
+    final_path = move_to_archive(filepath, institution)
+
+    # 📝 Index aktualisieren (Jahr wird intern automatisch gesetzt)
+    update_index(final_path, institution, content_hash)
+
+    # 🔎 OCR-Text in den Volltextindex aufnehmen
+    with timed("fulltext_index"):
+        index_document(final_path, text)
+
+    return {"path": final_path, "institution": institution, "pages": len(ocr["pages"]),
+            "duplicate": False, "deferred": False}
+
+
+# ============================================================
+# ⏳ Vollständige OCR nachholen
+# ============================================================
+def _path_lock(path: str) -> threading.Lock:
+    with _queue_lock:
+        return _path_locks.setdefault(path, threading.Lock())
+
+
+def complete_document(path: str):
+    """
+    Holt die vollständige OCR eines nur per Briefkopf abgelegten Dokuments nach
+    und ersetzt dessen Volltext. Gleichzeitige Aufrufe für denselben Pfad warten
+    aufeinander, die OCR läuft nur einmal.
+
+    Returns:
+        dict | None: OCR-Ergebnis ({"text", "pages", ...} wie ocr_document);
+                     None, wenn nichts (mehr) aussteht oder die OCR fehlschlug
+    """
+    with _path_lock(path):
+        try:
+            entry = get_pending(path)
+            if entry is None:
+                return None
+            if not os.path.exists(path):
+                remove_document(path)  # inzwischen gelöscht
+                COMPLETED.inc(result="missing")
+                return None
+
+            with timed("complete_ocr"):
+                ocr = ocr_document(path, content_hash=entry["sha256"], lang=entry["lang"])
+            if not ocr["pages"]:
+                # OCR fehlgeschlagen → Briefkopf bleibt im Index, nächster Versuch beim Neustart
+                COMPLETED.inc(result="error")
+                return None
+
+            with timed("fulltext_index"):
+                index_document(path, ocr["text"])
+            COMPLETED.inc(result="done")
+            log.info("Vollständige OCR nachgeholt", extra={"path": path, "pages": len(ocr["pages"])})
+            return ocr
+        finally:
+            with _queue_lock:
+                _path_locks.pop(path, None)
+
+
+def _completion_worker():
+    while True:
+        _, _, path = _queue.get()
+        with _queue_lock:
+            _queued.pop(path, None)
+        try:
+            complete_document(path)
+        except Exception as e:
+            log.error("Vollständige OCR fehlgeschlagen", extra={"path": path, "error": str(e)})
+
+
+def schedule_completion(path: str, priority: int = PRIORITY_BACKGROUND):
+    """Reiht ein Dokument zum Nachholen ein (angefragte Dokumente mit PRIORITY_DEMAND zuerst)."""
+    if not COMPLETE_IN_BACKGROUND:
+        return
+    with _queue_lock:
+        if _queued.get(path, PRIORITY_BACKGROUND + 1) <= priority:
+            return
+        _queued[path] = priority
+        if not _workers:
+            for i in range(COMPLETE_WORKERS):
+                worker = threading.Thread(target=_completion_worker, name=f"ocr-complete-{i}", daemon=True)
+                worker.start()
+                _workers.append(worker)
+    _queue.put((priority, next(_order), path))
+
+
+def resume_pending():
+    """Beim Start: alle noch ausstehenden Dokumente (z. B. nach Neustart) wieder einreihen."""
+    paths = pending_documents()
+    for path in paths:
+        schedule_completion(path)
+    if paths:
+        log.info("Ausstehende OCR eingeplant", extra={"files": len(paths)})
+
+
+def document_text(path: str) -> str:
+    """
+    Volltext eines archivierten Dokuments für /translate und /explain.
+    Steht die vollständige OCR noch aus, wird sie sofort (vorgezogen) erledigt.
+    """
+    ocr = complete_document(path)
+    if ocr is not None:
+        return ocr["text"]
+    if get_pending(path) is None:
+        text = get_text(path)
+        if text is not None:
+            return text
+    return run_ocr(path)
@@ -0,0 +1,187 @@
+# ==========================================================
+# 🧼 Bildvorverarbeitung vor Tesseract
+# Graustufen → (Schräglage korrigieren) → Binarisieren
+# Alles über Pillow-Operationen in C (Lookup-Tabellen, Filter),
+# keine Python-Schleifen über Pixel
+# Einstellungen: config/settings.yml → ocr
+# ==========================================================
+
+import math
+
+from config import get_setting
+from metrics import counter, timed
+
+# 🔧 Rasterauflösung je Dokument
+DPI = int(get_setting("ocr", "dpi", 200))                          # Ziel-DPI (Obergrenze)
+MIN_DPI = int(get_setting("ocr", "min_dpi", 150))                  # Untergrenze bei Scans mit geringer Auflösung
+MATCH_SCAN_DPI = bool(get_setting("ocr", "match_scan_dpi", False))  # nicht feiner rastern als der Scan selbst
+MAX_MEGAPIXELS = float(get_setting("ocr", "max_megapixels", 12))   # große Formate (A3, Pläne) begrenzen, 0 = aus
+
+# 🔧 Binarisierung: "fixed" (Schwelle), "otsu" (je Seite), "local" (je Umgebung), "none"
+BINARIZE = str(get_setting("ocr", "binarize", "fixed")).lower()
+THRESHOLD = int(get_setting("ocr", "threshold", 150))
+LOCAL_WINDOW = int(get_setting("ocr", "local_window", 31))         # Kantenlänge der Umgebung in Pixel
+LOCAL_OFFSET = int(get_setting("ocr", "local_offset", 10))         # so viel dunkler als die Umgebung = Schrift
+
+# 🔧 Schräglage (Projektionsprofil auf verkleinerter Seite)
+DESKEW = bool(get_setting("ocr", "deskew", False))
+DESKEW_MAX_ANGLE = float(get_setting("ocr", "deskew_max_angle", 3.0))
+DESKEW_STEP = float(get_setting("ocr", "deskew_step", 0.25))
+DESKEW_PREVIEW_WIDTH = 600
+
+PIXELS = counter("autodoc_ocr_pixels_total", "An Tesseract übergebene Pixel")
+
+_luts = {}
+
+
+def signature() -> str:
+    """Alle Parameter, die das OCR-Ergebnis beeinflussen (→ Cache-Schlüssel)."""
+    parts = [f"dpi={DPI}/{MIN_DPI}/{int(MATCH_SCAN_DPI)}/{MAX_MEGAPIXELS:g}", f"bin={BINARIZE}"]
+    if BINARIZE == "fixed":
+        parts[-1] += f":{THRESHOLD}"
+    elif BINARIZE == "local":
+        parts[-1] += f":{LOCAL_WINDOW}/{LOCAL_OFFSET}"
+    if DESKEW:
+        parts.append(f"deskew={DESKEW_MAX_ANGLE:g}/{DESKEW_STEP:g}")
+    return "|".join(parts)
+
+
+# ============================================================
+# 📐 Auflösung
+# ============================================================
+def choose_dpi(page_width_pt: float = 0, page_height_pt: float = 0, scan_dpi: float = 0) -> int:
+    """
+    Raster-DPI für ein Dokument.
+    Gescannte Seiten werden nicht feiner gerastert als eingescannt (hochrechnen bringt
+    Tesseract nichts, kostet aber Zeit), große Formate werden auf MAX_MEGAPIXELS begrenzt.
+    """
+    dpi = DPI
+    if MATCH_SCAN_DPI and scan_dpi:
+        dpi = min(dpi, max(MIN_DPI, int(round(scan_dpi))))
+    if MAX_MEGAPIXELS > 0 and page_width_pt and page_height_pt:
+        area_sq_inch = (page_width_pt / 72) * (page_height_pt / 72)
+        dpi = min(dpi, int(math.sqrt(MAX_MEGAPIXELS * 1e6 / area_sq_inch)))
+    return max(dpi, 72)
+
+
+def scale_to_dpi(img, source_dpi: float):
+    """Bilddateien mit höherer Auflösung als DPI vor der OCR verkleinern."""
+    if not source_dpi or source_dpi <= DPI * 1.1:
+        return img, int(source_dpi or 0)
+    from PIL import Image
+
+    factor = DPI / source_dpi
+    size = (max(1, round(img.width * factor)), max(1, round(img.height * factor)))
+    return img.resize(size, Image.LANCZOS), DPI
+
+
+# ============================================================
+# ⚫ Binarisierung
+# ============================================================
+def _threshold_lut(threshold: int) -> list:
+    """256er-Tabelle: < threshold → schwarz; wird pro Schwelle nur einmal gebaut."""
+    lut = _luts.get(threshold)
+    if lut is None:
+        lut = _luts[threshold] = [0] * threshold + [255] * (256 - threshold)
+    return lut
+
+
+def otsu_threshold(gray) -> int:
+    """Otsu-Schwelle aus dem Histogramm (256 Werte statt aller Pixel)."""
+    hist = gray.histogram()[:256]
+    total = sum(hist)
+    if not total:
+        return THRESHOLD
+    sum_all = sum(i * h for i, h in enumerate(hist))
+
+    best, best_var = THRESHOLD, -1.0
+    weight_bg = sum_bg = 0
+    for t in range(256):
+        weight_bg += hist[t]
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * hist[t]
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if var > best_var:
+            best, best_var = t + 1, var  # Pixel <= t gehören zur Schrift
+    return best
+
+
+def _binarize_local(gray):
+    """
+    Schrift = deutlich dunkler als der Mittelwert der Umgebung.
+    Hilft bei Schatten, Stempeln und ungleichmäßig ausgeleuchteten Handyfotos.
+    """
+    from PIL import ImageChops, ImageFilter
+
+    mean = gray.filter(ImageFilter.BoxBlur(max(1, LOCAL_WINDOW // 2)))
+    darker = ImageChops.subtract(mean, gray)  # 0, wo das Pixel heller als die Umgebung ist
+    lut = [255] * (LOCAL_OFFSET + 1) + [0] * (255 - LOCAL_OFFSET)
+    return darker.point(lut, "1")
+
+
+def binarize(gray):
+    if BINARIZE == "none":
+        return gray
+    if BINARIZE == "local":
+        return _binarize_local(gray)
+    threshold = otsu_threshold(gray) if BINARIZE == "otsu" else THRESHOLD
+    return gray.point(_threshold_lut(threshold), "1")
+
+
+# ============================================================
+# 📐 Schräglage
+# ============================================================
+def _profile_score(ink, angle: float) -> float:
+    from PIL import Image
+
+    rotated = ink.rotate(angle, resample=Image.BILINEAR, fillcolor=0)
+    rows = list(rotated.resize((1, rotated.height), Image.BOX).getdata())
+    # Gerade Zeilen → scharfe Wechsel zwischen Text- und Leerzeilen
+    return sum((b - a) ** 2 for a, b in zip(rows, rows[1:]))
+
+
+def estimate_skew(gray) -> float:
+    """Winkel in Grad, um den die Seite gedreht werden muss (0 = gerade)."""
+    from PIL import Image, ImageOps
+
+    scale = min(1.0, DESKEW_PREVIEW_WIDTH / gray.width)
+    small = gray.resize((max(1, int(gray.width * scale)), max(1, int(gray.height * scale))), Image.BOX)
+    ink = ImageOps.invert(small.point(_threshold_lut(otsu_threshold(small))))
+
+    def best(angles):
+        return max(angles, key=lambda angle: (_profile_score(ink, angle), -abs(angle)))
+
+    # Grob in 1°-Schritten, dann fein um den besten Winkel herum
+    coarse = best([float(a) for a in range(-int(DESKEW_MAX_ANGLE), int(DESKEW_MAX_ANGLE) + 1)])
+    steps = max(1, int(1 / DESKEW_STEP))
+    fine = [coarse + i * DESKEW_STEP for i in range(-steps + 1, steps)]
+    return best([a for a in fine if abs(a) <= DESKEW_MAX_ANGLE])
+
+
+def deskew(gray):
+    from PIL import Image
+
+    angle = estimate_skew(gray)
+    if abs(angle) < DESKEW_STEP / 2:
+        return gray
+    return gray.rotate(angle, resample=Image.BICUBIC, fillcolor=255)
+
+
+# ============================================================
+# 🧼 Gesamter Ablauf
+# ============================================================
+def preprocess(img):
+    """Bild für Tesseract vorbereiten (Graustufen, ggf. gerade gedreht, binarisiert)."""
+    with timed("preprocess"):
+        gray = img.convert("L")
+        if DESKEW:
+            gray = deskew(gray)
+        result = binarize(gray)
+    PIXELS.inc(result.width * result.height)
+    return result
@@ -4,6 +4,9 @@
 
 let currentPath = "";   // Start = root (Archive)
 let contextMenu;
+let currentSort = "name";   // name | mtime | size
+let currentOrder = "asc";   // asc | desc
+let listOffset = 0;         // bereits geladene Einträge des aktuellen Ordners
 
 // 🌍 Unterstützte Sprachen
 const supportedLanguages = [
@@ -39,6 +42,30 @@ function showBanner(message, type = "success") {
   }, 3000);
 }
 
+// =========================================================
+// 🧵 Upload-Jobs abfragen (Verarbeitung läuft im Hintergrund)
+// =========================================================
+async function waitForJobs(jobs) {
+  const ids = jobs.map(j => j.id);
+  while (true) {
+    const res = await fetch(`/jobs?ids=${encodeURIComponent(ids.join(","))}`);
+    if (!res.ok) throw new Error("Job-Status nicht abrufbar");
+
+    const data = await res.json();
+    const open = data.jobs.filter(j => j.status === "queued" || j.status === "running");
+    if (open.length === 0) return data.jobs;
+
+    await new Promise(resolve => setTimeout(resolve, 1000));
+  }
+}
+
+function showJobResult(jobs) {
+  const failed = jobs.filter(j => j.status === "error");
+  if (failed.length === 0) showBanner(`✅ ${jobs.length} Datei(en) archiviert`, "success");
+  else showBanner(`❌ ${failed.length} von ${jobs.length} Datei(en) fehlgeschlagen: ` +
+                  failed.map(j => j.filename).join(", "), "error");
+}
+
 // =========================================================
 // 📤 Upload (Formular + Dateiliste)
 // =========================================================
@@ -99,10 +126,12 @@ document.addEventListener("DOMContentLoaded", () => {
         try {
           const res = await fetch("/upload", { method: "POST", body: new FormData(this) });
           if (res.ok) {
-            showBanner("✅ Upload erfolgreich!", "success");
+            const data = await res.json();
+            showBanner(`⏳ ${data.jobs.length} Datei(en) werden verarbeitet...`, "success");
             fileList.innerHTML = "";
             fileInput.value = "";
             importBtn.disabled = true;
+            showJobResult(await waitForJobs(data.jobs));
             loadFolder(currentPath);
           } else showBanner("❌ Fehler beim Upload", "error");
         } catch (err) {
@@ -133,15 +162,27 @@ if (dropZone) {
     try {
       const res = await fetch("/upload", { method: "POST", body: formData });
       if (res.ok) {
-        const confirmDelete = confirm("✅ Upload erfolgreich!\n\nOriginal-Dateien löschen?");
-        if (confirmDelete) {
+        const data = await res.json();
+        const jobs = await waitForJobs(data.jobs);
+        showJobResult(jobs);
+
+        // 🗑️ Löschen nur für archivierte Dateien anbieten, fehlgeschlagene/abgelehnte behalten
+        const done = jobs.filter(j => j.status === "done").map(j => j.filename);
+        const kept = jobs.filter(j => j.status !== "done").map(j => j.filename)
+          .concat((data.rejected || []).map(r => r.filename));
+        const keptNote = kept.length
+          ? `\n\n❌ Nicht archiviert (Originale bleiben erhalten):\n${kept.join("\n")}` : "";
+
+        if (done.length > 0 &&
+            confirm(`✅ ${done.length} Datei(en) archiviert.${keptNote}\n\nOriginale der archivierten Dateien löschen?`)) {
           await fetch("/delete_originals", {
             method: "POST",
             headers: {"Content-Type": "application/json"},
-            body: JSON.stringify({ filenames: Array.from(files).map(f => f.name) })
+            body: JSON.stringify({ filenames: done })
           });
-          showBanner("🗑️ Originale gelöscht", "success");
-        } else showBanner("✅ Dateien behalten", "success");
+          showBanner(`🗑️ ${done.length} Original(e) gelöscht` +
+                     (kept.length ? `, behalten: ${kept.join(", ")}` : ""), kept.length ? "error" : "success");
+        } else if (done.length > 0) showBanner("✅ Dateien behalten", "success");
         loadFolder(currentPath);
       } else showBanner("❌ Fehler beim Upload", "error");
     } catch (err) {
@@ -168,26 +209,50 @@ function renderBreadcrumb(path) {
 // =========================================================
 // 📂 Ordner & Dateien laden
 // =========================================================
-async function loadFolder(path = "") {
+async function loadFolder(path = "", append = false) {
   currentPath = path;
-  const res = await fetch(`/list?path=${encodeURIComponent(currentPath)}`);
+  if (!append) listOffset = 0;
+  const params = new URLSearchParams({ path: currentPath, sort: currentSort, order: currentOrder, offset: listOffset });
+  const res = await fetch(`/list?${params}`);
 
   if (!res.ok) {
     showBanner("❌ Fehler beim Laden des Verzeichnisses", "error");
     return;
   }
 
-  const items = await res.json();
+  const data = await res.json();
   renderBreadcrumb(currentPath);
 
   const ul = document.getElementById("file-list");
-  ul.innerHTML = "";
+  if (!append) ul.innerHTML = "";
 
-  items.forEach(item => {
+  data.items.forEach(item => {
     const relPath = currentPath ? currentPath + "/" + item.name : item.name;
     const li = document.createElement("li");
     li.textContent = (item.is_dir ? "📂 " : "📄 ") + item.name;
 
+    // 🖼️ Vorschaubild (wird erst geladen, wenn sichtbar; v = mtime → Browser-Cache ohne Rückfrage)
+    if (!item.is_dir && /\.(pdf|png|jpe?g|tiff?|bmp)$/i.test(item.name)) {
+      const img = document.createElement("img");
+      img.className = "thumb";
+      img.loading = "lazy";
+      img.alt = "";
+      img.src = `/thumbnail?file=${encodeURIComponent(relPath)}&v=${item.mtime}`;
+      img.onerror = () => img.remove();
+      li.prepend(img);
+    }
+
+    // ℹ️ Größe, Datum und Index-Daten kommen direkt mit /list
+    if (!item.is_dir) {
+      const meta = document.createElement("div");
+      meta.className = "file-meta";
+      const parts = [formatSize(item.size), new Date(item.mtime * 1000).toLocaleDateString("de-DE")];
+      if (item.institution) parts.unshift(item.institution);
+      if (item.partial) parts.push("⏳ Volltext folgt");
+      meta.textContent = parts.join(" · ");
+      li.appendChild(meta);
+    }
+
     if (item.is_dir) {
       li.ondblclick = () => loadFolder(relPath);
       li.oncontextmenu = e => { e.preventDefault(); showFolderMenu(e.pageX, e.pageY, relPath); };
@@ -197,8 +262,35 @@ async function loadFolder(path = "") {
     }
     ul.appendChild(li);
   });
+
+  // ➕ Große Ordner seitenweise nachladen
+  listOffset += data.items.length;
+  const more = document.getElementById("load-more");
+  if (more) {
+    more.style.display = listOffset < data.total ? "block" : "none";
+    more.textContent = `➕ Weitere laden (${listOffset} von ${data.total})`;
+  }
+}
+
+function formatSize(bytes) {
+  if (bytes < 1024) return bytes + " B";
+  if (bytes < 1024 * 1024) return (bytes / 1024).toFixed(0) + " KB";
+  return (bytes / (1024 * 1024)).toFixed(1) + " MB";
 }
 
+document.addEventListener("DOMContentLoaded", () => {
+  const more = document.getElementById("load-more");
+  if (more) more.addEventListener("click", () => loadFolder(currentPath, true));
+
+  const sortSelect = document.getElementById("sort-select");
+  if (sortSelect) {
+    sortSelect.addEventListener("change", () => {
+      [currentSort, currentOrder] = sortSelect.value.split(":");
+      loadFolder(currentPath);
+    });
+  }
+});
+
 // =========================================================
 // 📄 Datei öffnen / herunterladen
 // =========================================================
@@ -267,9 +359,17 @@ document.addEventListener("DOMContentLoaded", () => {
 
         const ul = document.getElementById("file-list");
         ul.innerHTML = "";
+        document.getElementById("load-more").style.display = "none";
         results.forEach(item => {
           const li = document.createElement("li");
           li.textContent = "📄 " + item.filename + ` (${item.institution}, ${item.year})`;
+          if (item.partial) li.title = "Volltext wird noch erkannt – bisher nur der Briefkopf durchsuchbar";
+          if (item.snippet) {
+            const snippet = document.createElement("div");
+            snippet.className = "search-snippet";
+            snippet.textContent = item.snippet;
+            li.appendChild(snippet);
+          }
           li.onclick = () => window.open(`/download?file=${encodeURIComponent(item.path)}`, "_blank");
           ul.appendChild(li);
         });
@@ -342,7 +442,27 @@ function createModal(path, actionLabel, endpoint) {
     const lang = select.value;
     outputArea.value = "⏳ " + actionLabel + "...";
     const res = await fetch(`${endpoint}?file=${encodeURIComponent(path)}&lang=${encodeURIComponent(lang)}`);
-    outputArea.value = await res.text();
+    if (!res.ok) {
+      const data = await res.json().catch(() => ({}));
+      outputArea.value = "❌ " + (data.error || res.statusText);
+      return;
+    }
+
+    // 📡 Antwort anzeigen, sobald die ersten Teile eintreffen (Streaming)
+    if (res.body && res.body.getReader) {
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let first = true;
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        if (first) { outputArea.value = ""; first = false; }
+        outputArea.value += decoder.decode(value, { stream: true });
+      }
+      if (first) outputArea.value = "";
+    } else {
+      outputArea.value = await res.text();
+    }
   };
 
   const closeBtn = document.createElement("button");
@@ -1,12 +1,117 @@
 # ✅ Einfache Tests für AutoDocOrganizer
 
-from extract_institution import detect_institution
+import os
+import random
+import tempfile
+import threading
+from types import SimpleNamespace
+
+import extract_institution as ei
+from extract_institution import extract_institution
+from matcher import InstitutionMatcher
+from translate import _cut_point, _split_chunks
+
+
+def _fake_nlp(text):
+    """Ersatz für spaCy: NER ohne ORG-Entitäten (Test läuft auch ohne Modell)."""
+    return SimpleNamespace(ents=[])
+
 
 def test_institution():
-    assert detect_institution("Finanzamt Gießen") == "Finanzamt"
-    assert detect_institution("Sparkasse Marburg") == "Sparkasse"
-    assert detect_institution("Unbekanntes Dokument") == "_Unklar"
+    # institutions_seen.json bleibt unverändert
+    original = ei.get_nlp, ei.save_institution
+    ei.get_nlp, ei.save_institution = (lambda: _fake_nlp), (lambda name: None)
+    try:
+        assert extract_institution("Finanzamt Gießen") == "Finanzamt"
+        assert extract_institution("Sparkasse Marburg") == "Sparkasse"
+        assert extract_institution("Unbekanntes Dokument") == "_Unklar"
+    finally:
+        ei.get_nlp, ei.save_institution = original
+
+
+def test_split_chunks():
+    # Zufallstexte aus kurzen/langen Wörtern, Satzenden, Zeilen und Absätzen
+    rng = random.Random(13)
+    tokens = ["a", "Wort", "Satz.", "Ende!", "x" * 40, " ", "  ", "\n", "\n\n", "\n\n\n", "\t"]
+    for _ in range(2000):
+        text = "".join(rng.choice(tokens) for _ in range(rng.randint(0, 60)))
+        limit = rng.randint(1, 50)
+
+        chunks = _split_chunks(text, limit)
+        assert "".join(c + s for c, s in chunks) == text, (text, limit)
+        assert all(len(c) <= limit for c, _ in chunks), (text, limit)
+
+        if len(text) > limit:
+            cut, sep = _cut_point(text, limit)
+            assert 0 < cut <= limit
+            assert text[cut:cut + len(sep)] == sep and not sep.strip()
+
+
+def test_matcher():
+    # Automat gegen die frühere lineare Suche: kleinste Priorität unter allen enthaltenen Namen
+    rng = random.Random(7)
+    for _ in range(300):
+        matcher, names = InstitutionMatcher(), {}
+        for step in range(rng.randint(1, 150)):
+            name = "".join(rng.choice("abAB c") for _ in range(rng.randint(1, 5)))
+            priority = (rng.randint(0, 3), step)   # eindeutig → kein Gleichstand
+            matcher.add(name, priority)
+            if name.lower() not in names or priority < names[name.lower()][0]:
+                names[name.lower()] = (priority, name)
+
+            # Abfragen und rebuild() zwischen den Einfügungen (Nebenliste + Automat gemischt)
+            if rng.random() < 0.3:
+                text = "".join(rng.choice("abc d") for _ in range(rng.randint(0, 30)))
+                hits = [entry for pattern, entry in names.items() if pattern in text]
+                assert matcher.find_best(text) == (min(hits)[1] if hits else None), (names, text)
+            if rng.random() < 0.05:
+                matcher.rebuild()
+
+
+def test_group_writer():
+    # Eigene index.db im Temp-Ordner; ein fehlschlagender Auftrag darf die übrigen im Batch nicht zurückrollen
+    import indexer
+
+    original = indexer.INDEX_DB, indexer.INDEX_FILE, indexer._initialized
+    with tempfile.TemporaryDirectory() as tmp:
+        indexer.INDEX_DB = os.path.join(tmp, "index.db")
+        indexer.INDEX_FILE = os.path.join(tmp, "index.csv")
+        indexer._initialized, indexer._local.conn = False, None
+        try:
+            def insert(path):
+                return lambda conn: conn.execute(indexer._UPSERT, (path, "a.pdf", "2024", "Test", 0.0, None)).rowcount
+
+            def failing(conn):
+                insert("/b.pdf")(conn)
+                raise ValueError("kaputt")
+
+            writer = indexer._GroupWriter()
+            batch = [{"func": func, "done": threading.Event(), "result": None, "error": None}
+                     for func in (insert("/a.pdf"), failing, insert("/c.pdf"))]
+            writer._commit(batch)
+
+            assert all(job["done"].is_set() for job in batch)
+            assert batch[0]["result"] == 1 and batch[2]["result"] == 1
+            assert isinstance(batch[1]["error"], ValueError)
+            assert batch[0]["error"] is None and batch[2]["error"] is None
+
+            paths = {r["path"] for r in indexer.get_connection().execute("SELECT path FROM documents")}
+            assert paths == {"/a.pdf", "/c.pdf"}
+
+            # Über submit() kommt der Fehler beim Aufrufer an
+            try:
+                writer.submit(failing)
+                assert False, "Fehler nicht weitergereicht"
+            except ValueError:
+                pass
+        finally:
+            indexer.get_connection().close()
+            indexer.INDEX_DB, indexer.INDEX_FILE, indexer._initialized = original
+            indexer._local.conn = None
 
 if __name__ == "__main__":
     test_institution()
+    test_split_chunks()
+    test_matcher()
+    test_group_writer()
     print("✅ Alle Tests bestanden.")
@@ -0,0 +1,110 @@
+# ==========================================================
+# 🖼️ Vorschaubilder für AutoDocOrganizer
+# Entstehen nebenbei beim Rastern für die OCR, fehlende werden
+# im Hintergrund oder bei der ersten Anfrage erzeugt
+# Cache: Desktop/AutoDocOrganizer/Cache/thumbs (nach Inhalts-Hash)
+# ==========================================================
+
+import io
+import logging
+import os
+
+from cache_store import DiskCache
+from config import get_setting
+from fileops import ARCHIVE_DIR
+from metrics import timed
+
+THUMB_SIZE = int(get_setting("thumbnails", "size", 200))          # längste Kante in Pixel
+THUMB_ALL_PAGES = bool(get_setting("thumbnails", "all_pages", False))
+THUMB_EXTENSIONS = (".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")
+
+THUMB_CACHE = DiskCache("thumbs", max_bytes=int(get_setting("thumbnails", "cache_max_mb", 128)) * 1024 * 1024)
+
+
+log = logging.getLogger(__name__)
+
+
+def _key(content_hash: str, page_no: int) -> str:
+    return f"{content_hash}|p{page_no}|{THUMB_SIZE}"
+
+
+def _render_jpeg(img) -> bytes:
+    thumb = img.copy()
+    thumb.thumbnail((THUMB_SIZE, THUMB_SIZE))
+    if thumb.mode not in ("RGB", "L"):
+        thumb = thumb.convert("RGB")
+    buffer = io.BytesIO()
+    thumb.save(buffer, format="JPEG", quality=75, optimize=True)
+    return buffer.getvalue()
+
+
+def store_page_thumbnail(content_hash: str, page_no: int, img):
+    """
+    Speichert das Vorschaubild einer bereits gerasterten Seite
+    (Seite 1 immer, weitere nur mit thumbnails.all_pages).
+    """
+    if page_no != 1 and not THUMB_ALL_PAGES:
+        return
+    key = _key(content_hash, page_no)
+    if THUMB_CACHE.get(key) is None:
+        THUMB_CACHE.set(key, _render_jpeg(img))
+
+
+def _rasterize_page(filepath: str, page_no: int):
+    from ocr import load_ocr_libs, POPPLER_PATH
+
+    libs = load_ocr_libs()
+    if not filepath.lower().endswith(".pdf"):
+        return libs.Image.open(filepath) if page_no == 1 else None
+
+    # Kleine Auflösung genügt für die Vorschau
+    images = libs.convert_from_path(filepath, poppler_path=POPPLER_PATH, first_page=page_no,
+                                    last_page=page_no, size=(None, THUMB_SIZE * 2))
+    return images[0] if images else None
+
+
+def get_thumbnail(filepath: str, content_hash: str, page_no: int = 1):
+    """
+    Vorschaubild als JPEG-Bytes – aus dem Cache oder einmalig neu gerastert.
+    Returns:
+        bytes | None: None, wenn die Seite nicht existiert
+    """
+    key = _key(content_hash, page_no)
+    data = THUMB_CACHE.get(key)
+    if data is not None:
+        return data
+
+    with timed("thumbnail"):
+        img = _rasterize_page(filepath, page_no)
+        if img is None:
+            return None
+        data = _render_jpeg(img)
+    THUMB_CACHE.set(key, data)
+    return data
+
+
+# ============================================================
+# 🔁 Vorschaubilder für vorhandene Archivdateien erzeugen
+# ============================================================
+def backfill_thumbnails():
+    """Erzeugt fehlende Vorschaubilder (Seite 1) für alle Dateien im Archiv."""
+    from indexer import content_hash_for
+
+    created = 0
+    for dirpath, _, filenames in os.walk(ARCHIVE_DIR):
+        for fname in filenames:
+            if not fname.lower().endswith(THUMB_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, fname)
+            try:
+                content_hash = content_hash_for(path)
+                if THUMB_CACHE.get(_key(content_hash, 1)) is None:
+                    get_thumbnail(path, content_hash, 1)
+                    created += 1
+            except Exception as e:
+                log.warning("Vorschaubild fehlgeschlagen", extra={"path": path, "error": str(e)})
+    log.info("Vorschaubilder erzeugt", extra={"thumbnails": created})
+
+
+if __name__ == "__main__":
+    backfill_thumbnails()
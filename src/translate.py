@@ -1,24 +1,166 @@
 # 📁 translate.py
+import hashlib
+import logging
 import os
-import deepl
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from cache_store import DiskCache
+from config import get_setting
+from metrics import counter, timed
 
 LANGUAGE_MAP = {
     "EN": "EN-US",   # standardizează engleza la EN-US
     "PT": "PT-PT",   # DeepL cere explicit PT-PT sau PT-BR
 }
 
+# 🔧 Einstellungen (config/settings.yml → translate, Backend per .env überschreibbar)
+TRANSLATE_BACKEND = os.getenv("TRANSLATE_BACKEND", get_setting("translate", "backend", "deepl"))
+CHUNK_CHARS = int(get_setting("translate", "chunk_chars", 5000))
+MAX_PARALLEL = int(get_setting("translate", "max_parallel", 4))
+
+# 🗄️ Übersetzungen nach (Text-Hash, Zielsprache) cachen
+TRANSLATION_CACHE = DiskCache("translate", max_bytes=int(get_setting("translate", "cache_max_mb", 64)) * 1024 * 1024)
+
+_executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL, thread_name_prefix="translate")
+_translator = None
+_translator_lock = threading.Lock()
+
+log = logging.getLogger(__name__)
+
+CHUNKS = counter("autodoc_translate_chunks_total", "An das Übersetzungs-Backend geschickte Abschnitte")
+
+
+class FakeTranslator:
+    """
+    Lokaler Ersatz für DeepL (Entwicklung/Tests, TRANSLATE_BACKEND=fake).
+    Liefert den Text mit vorangestellter Zielsprache, optional mit künstlicher Latenz.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def translate_text(self, text: str, target_lang: str):
+        if self.latency:
+            time.sleep(self.latency)
+        return SimpleNamespace(text=f"[{target_lang}] {text}")
+
+
+def get_translator():
+    """
+    Ein langlebiger Client pro Prozess (deepl.Translator hält seine HTTP-Session offen).
+    """
+    global _translator
+    if _translator is not None:
+        return _translator
+
+    with _translator_lock:
+        if _translator is None:
+            if TRANSLATE_BACKEND == "fake":
+                _translator = FakeTranslator(float(os.getenv("TRANSLATE_FAKE_LATENCY", "0")))
+            else:
+                auth_key = os.getenv("DEEPL_API_KEY")
+                if not auth_key:
+                    raise ValueError("❌ DeepL API Key fehlt in den Umgebungsvariablen!")
+
+                import deepl  # erst bei Bedarf laden (schneller Start der App)
+
+                _translator = deepl.Translator(auth_key)
+    return _translator
+
+
+# Satzende: Punkt/Frage/Ausruf (ggf. mit schließendem Anführungszeichen/Klammer) + Leerraum
+_SENTENCE_END = re.compile(r"[.!?…][\"'»«“”)\]]*(?=\s)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _cut_point(paragraph: str, limit: int) -> tuple:
+    """
+    Schnittstelle für einen überlangen Absatz: letzter Zeilenumbruch, sonst letztes
+    Satzende, sonst letzter Leerraum vor limit – notfalls hart bei limit.
+
+    Returns:
+        tuple: (Position, Trenner), Trenner = Leerraum ab Position (beim harten Schnitt "")
+    """
+    window = paragraph[:limit + 1]   # Trenner darf direkt an der Grenze beginnen
+    cut = window.rfind("\n")
+    if cut <= 0:
+        cut = max((m.end() for m in _SENTENCE_END.finditer(window) if m.end() <= limit), default=0)
+    if cut <= 0:
+        cut = max((m.start() for m in _WHITESPACE.finditer(window) if 0 < m.start() <= limit), default=0)
+    if cut <= 0:
+        return limit, ""
+    return cut, _WHITESPACE.match(paragraph, cut).group()
+
+
+def _split_chunks(text: str, limit: int = CHUNK_CHARS) -> list:
+    """
+    Teilt Text an Absätzen (Leerzeilen) in Stücke von höchstens limit Zeichen.
+    Überlange Absätze werden an Zeilen, Satzenden oder Leerzeichen geteilt, nie mitten im Wort
+    (außer ein einzelnes Wort ist länger als limit).
+
+    Returns:
+        list[tuple]: (Abschnitt, Trenner) – "".join(Abschnitt + Trenner) ergibt wieder den Text
+    """
+    pieces = []
+    paragraphs = text.split("\n\n")
+    for i, paragraph in enumerate(paragraphs):
+        while len(paragraph) > limit:
+            cut, sep = _cut_point(paragraph, limit)
+            pieces.append((paragraph[:cut], sep))
+            paragraph = paragraph[cut + len(sep):]
+        pieces.append((paragraph, "\n\n" if i < len(paragraphs) - 1 else ""))
+
+    chunks = []
+    for piece, sep in pieces:
+        if chunks and len(chunks[-1][0]) + len(chunks[-1][1]) + len(piece) <= limit:
+            chunks[-1] = (chunks[-1][0] + chunks[-1][1] + piece, sep)
+        else:
+            chunks.append((piece, sep))
+    return chunks
+
+
+def _translate_chunk(chunk: str, target_lang: str) -> str:
+    if not chunk.strip():
+        return chunk
+    CHUNKS.inc()
+    with timed("translate_chunk"):
+        return get_translator().translate_text(chunk, target_lang=target_lang).text
+
+
 def translate_text(text: str, target_lang: str) -> str:
     """
     Übersetzt den gegebenen Text automatisch nach target_lang.
     Die Ausgangssprache wird automatisch erkannt.
+    Lange Texte werden absatzweise parallel übersetzt und in Reihenfolge zusammengesetzt.
     """
-    auth_key = os.getenv("DEEPL_API_KEY")
-    if not auth_key:
-        raise ValueError("❌ DeepL API Key fehlt in den Umgebungsvariablen!")
-
     # Normalizare coduri limbă
     target_lang = LANGUAGE_MAP.get(target_lang, target_lang)
 
-    translator = deepl.Translator(auth_key)
-    result = translator.translate_text(text, target_lang=target_lang)
-    return result.text
+    if not text or not text.strip():
+        return text
+
+    key = f"{hashlib.sha256(text.encode('utf-8')).hexdigest()}|{target_lang}|{TRANSLATE_BACKEND}"
+    cached = TRANSLATION_CACHE.get(key)
+    if cached is not None:
+        return cached.decode("utf-8")
+
+    get_translator()  # Fehlender API-Key → ValueError vor dem Aufteilen
+    chunks = _split_chunks(text)
+    with timed("translate"):
+        if len(chunks) == 1:
+            translated = [_translate_chunk(chunks[0][0], target_lang)]
+        else:
+            # map() liefert die Ergebnisse in Eingabereihenfolge
+            translated = _executor.map(lambda chunk: _translate_chunk(chunk[0], target_lang), chunks)
+        # Mit den ursprünglichen Trennern zusammensetzen (Zeilen-/Absatzstruktur bleibt erhalten)
+        result = "".join(part + sep for part, (_, sep) in zip(translated, chunks))
+
+    try:
+        TRANSLATION_CACHE.set(key, result.encode("utf-8"))
+    except OSError as e:
+        log.warning("Übersetzungs-Cache nicht schreibbar", extra={"error": str(e)})
+    return result
@@ -1,67 +1,194 @@
 # ==========================================================
 # 📂 Watcher für AutoDocOrganizer
 # Überwacht ScansInbox und verschiebt neue Dateien direkt ins Archiv
+# Logik: Ereignisse sammeln → warten bis Datei fertig geschrieben →
+#        Verarbeitung in begrenztem Worker-Pool
 # ==========================================================
 
+import logging
 import os
+import threading
 import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
-from ocr import run_ocr
-from extract_institution import extract_institution   # ⚡ Institutionserkennung
-from fileops import move_to_archive
-from indexer import update_index                      # 📒 Index aktualisieren
+from config import get_setting
+from logs import configure_logging
+from metrics import gauge, serve_metrics
+from pipeline import process_document, resume_pending
 
 # 📌 Basisordner
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 SCANS_INBOX = os.path.join(BASE_DIR, os.getenv("SCANS_INBOX", "ScansInbox"))
 
-
-class ScanHandler(FileSystemEventHandler):
-    """Reagiert auf neue Dateien im ScansInbox-Ordner"""
-
-    def on_created(self, event):
-        if event.is_directory:
+# 🔧 Einstellungen (config/settings.yml → watcher)
+WATCH_WORKERS = int(get_setting("watcher", "workers", 0)) or os.cpu_count() or 1
+STABLE_SECONDS = float(get_setting("watcher", "stable_seconds", 2.0))  # Größe/mtime so lange unverändert
+POLL_INTERVAL = float(get_setting("watcher", "poll_interval", 0.5))
+MAX_IN_FLIGHT = int(get_setting("watcher", "max_in_flight", 0)) or WATCH_WORKERS * 2
+METRICS_PORT = int(get_setting("watcher", "metrics_port", 0))  # 0 = kein /metrics-Endpunkt
+
+# Halbfertige / temporäre Dateien von Scanner oder Kopiervorgang ignorieren
+IGNORED_SUFFIXES = (".part", ".tmp", ".crdownload", ".partial")
+
+log = logging.getLogger(__name__)
+
+
+def _is_candidate(path: str) -> bool:
+    name = os.path.basename(path)
+    return not (name.startswith(".") or name.startswith("~") or name.lower().endswith(IGNORED_SUFFIXES))
+
+
+class IngestQueue:
+    """
+    Sammelt Dateipfade aus Watchdog-Ereignissen (Duplikate werden zusammengefasst),
+    wartet, bis Größe und Änderungszeit stabil sind, und übergibt die Datei dann
+    an einen begrenzten Worker-Pool. Sind alle Plätze belegt, bleibt die Datei
+    einfach in der Warteliste (Gegendruck statt unbegrenzter Warteschlange).
+    """
+
+    def __init__(self, workers: int = WATCH_WORKERS, max_in_flight: int = MAX_IN_FLIGHT):
+        self._pending = {}          # Pfad → (Größe, mtime, seit wann unverändert)
+        self._in_flight = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="watch")
+        self._thread = threading.Thread(target=self._loop, name="watch-stabilizer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def schedule(self, path: str):
+        """Datei (erneut) vormerken – mehrfache Ereignisse ergeben nur einen Eintrag."""
+        if not _is_candidate(path):
             return
-
-        filepath = event.src_path
-        print(f"📂 Neue Datei erkannt: {filepath}")
-
+        with self._lock:
+            if path not in self._in_flight:
+                self._pending[path] = None
+        self._wakeup.set()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending) + len(self._in_flight)
+
+    def waiting_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def in_flight_count(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    # ------------------------------------------------------
+    # ⏱️ Stabilitätsprüfung
+    # ------------------------------------------------------
+    def _ready_paths(self) -> list:
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for path, state in list(self._pending.items()):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    del self._pending[path]  # verschwunden oder umbenannt
+                    continue
+
+                signature = (st.st_size, st.st_mtime)
+                if state is None or state[:2] != signature:
+                    self._pending[path] = (*signature, now)
+                elif st.st_size > 0 and now - state[2] >= STABLE_SECONDS:
+                    ready.append(path)
+        return ready
+
+    def _loop(self):
+        while not self._stop.is_set():
+            for path in self._ready_paths():
+                # 🚦 Gegendruck: warten, bis ein Worker-Platz frei ist
+                while not self._slots.acquire(timeout=POLL_INTERVAL):
+                    if self._stop.is_set():
+                        return
+                with self._lock:
+                    if self._pending.pop(path, None) is None:
+                        self._slots.release()
+                        continue
+                    self._in_flight.add(path)
+                self._executor.submit(self._process, path)
+
+            self._wakeup.wait(POLL_INTERVAL)
+            self._wakeup.clear()
+
+    def _process(self, filepath: str):
         try:
-            # 1️⃣ OCR durchführen
-            text = run_ocr(filepath)
+            log.info("Neue Datei erkannt", extra={"path": filepath})
+            result = process_document(filepath)
+            log.info("Verarbeitet", extra={"path": result["path"], "institution": result["institution"]})
+        except Exception as e:
+            log.error("Fehler beim Verarbeiten", extra={"path": filepath, "error": str(e)})
+        finally:
+            with self._lock:
+                self._in_flight.discard(filepath)
+            self._slots.release()
 
-            # 2️⃣ Institution erkennen (Fallback = "_Unklar")
-            if not text or not text.strip():
-                print("⚠️ Kein Text erkannt – wird als '_Unklar' archiviert")
-                institution = "_Unklar"
-            else:
-                institution = extract_institution(text) or "_Unklar"
 
-            # 3️⃣ Jahr bestimmen (Fallback = aktuelles Jahr)
-            year = str(datetime.now().year)
+class ScanHandler(FileSystemEventHandler):
+    """Reagiert auf neue oder geänderte Dateien im ScansInbox-Ordner"""
 
-            # 4️⃣ Datei direkt ins Archiv verschieben
-            new_path = move_to_archive(filepath, institution, year)
+    def __init__(self, queue: IngestQueue):
+        super().__init__()
+        self.queue = queue
 
-            # 5️⃣ Index aktualisieren
-            update_index(new_path, year, institution)
+    def on_created(self, event):
+        if not event.is_directory:
+            self.queue.schedule(event.src_path)
 
-            print(f"✅ Verarbeitet: {new_path} ({institution})")
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.queue.schedule(event.src_path)
 
-        except Exception as e:
-            print(f"❌ Fehler beim Verarbeiten von {filepath}: {e}")
+    def on_moved(self, event):
+        # z. B. Scanner schreibt "scan.pdf.part" und benennt danach um
+        if not event.is_directory and os.path.dirname(event.dest_path) == os.path.dirname(event.src_path):
+            self.queue.schedule(event.dest_path)
 
 
 def start_watcher():
     """Startet den Watchdog-Observer für ScansInbox"""
-    event_handler = ScanHandler()
+    configure_logging()
+    os.makedirs(SCANS_INBOX, exist_ok=True)
+    queue = IngestQueue()
+    queue.start()
+
+    gauge("autodoc_watcher_waiting", "Dateien im Eingang, die noch nicht stabil sind", func=queue.waiting_count)
+    gauge("autodoc_watcher_in_flight", "Dateien in Verarbeitung durch den Watcher", func=queue.in_flight_count)
+    if METRICS_PORT:
+        serve_metrics(METRICS_PORT)
+        log.info("Metriken verfügbar", extra={"url": f"http://127.0.0.1:{METRICS_PORT}/metrics"})
+
     observer = Observer()
-    observer.schedule(event_handler, SCANS_INBOX, recursive=False)
+    observer.schedule(ScanHandler(queue), SCANS_INBOX, recursive=False)
     observer.start()
-    print(f"👀 Warte auf neue Dateien in {SCANS_INBOX} ...")
+
+    # 📥 Dateien, die schon vor dem Start im Eingang lagen
+    with os.scandir(SCANS_INBOX) as entries:
+        existing = [entry.path for entry in entries if entry.is_file()]
+    for path in existing:
+        queue.schedule(path)
+    if existing:
+        log.info("Vorhandene Dateien eingeplant", extra={"files": len(existing), "inbox": SCANS_INBOX})
+
+    # ⏳ Dokumente, deren vollständige OCR vor dem letzten Beenden noch ausstand
+    resume_pending()
+
+    log.info("Warte auf neue Dateien", extra={"inbox": SCANS_INBOX, "workers": WATCH_WORKERS})
 
     try:
         while True:
@@ -69,6 +196,7 @@ def start_watcher():
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    queue.stop()
 
 
 if __name__ == "__main__":